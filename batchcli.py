@@ -0,0 +1,243 @@
+"""
+Headless batch mode: OCRs and parses PDFs without the GUI and writes every
+check to the same results.db the GUI reads.
+
+    python batchcli.py scans/*.pdf --jobs 2
+    python batchcli.py archive/ --backend cascade --workers 4
+    python batchcli.py --watch inbox --google --credentials vision-key.json
+
+Each page is committed together with a checkpoint, so rerunning the same
+command after a crash or Ctrl+C continues from the first unfinished page and
+skips PDFs that were already done (unless the file changed since).
+"""
+import argparse
+import glob
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from checkrules import get_rules
+from checkstore import DEFAULT_DB_PATH, open_store
+from croparchive import DEFAULT_CROPS_DIR
+from ocrengine import shutdown_pool
+from parsepdf import PipelineSettings, format_page_record, iter_page_records, parse_page_record
+from pipelinestats import PipelineStats, profile_run
+
+
+def expand_inputs(inputs):
+    """PDF paths named by `inputs`: files, glob patterns or directories (their *.pdf files)."""
+    paths = []
+    for item in inputs:
+        if os.path.isdir(item):
+            matches = glob.glob(os.path.join(item, "*.pdf")) + glob.glob(os.path.join(item, "*.PDF"))
+        elif glob.has_magic(item):
+            matches = glob.glob(item, recursive=True)
+        else:
+            matches = [item]
+        paths.extend(sorted(matches))
+    unique = {}
+    for path in paths:
+        unique.setdefault(os.path.abspath(path), None)
+    return list(unique)
+
+
+def fingerprint(pdf_path):
+    """Changes whenever the file is replaced or rewritten."""
+    stat = os.stat(pdf_path)
+    return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+
+def process_pdf(store, pdf_path, use_google=False, settings=None, raw_text=False, stop=None, stats=None):
+    """
+    Runs one PDF through the pipeline, resuming at its checkpoint. Returns the
+    number of pages stored, or None if the PDF was already done. Setting the
+    `stop` event ends the run after the current page; the job then resumes
+    from its checkpoint next time. Timings go to `stats`, and to a report in
+    settings.profile_dir if set.
+    """
+    settings = settings or PipelineSettings()
+    stats = stats or PipelineStats()
+    start_page = store.start_job(pdf_path, fingerprint(pdf_path))
+    if start_page is None:
+        print(f"Skipping {pdf_path}: already processed.")
+        return None
+    if start_page > 1:
+        print(f"Resuming {pdf_path} at page {start_page}.")
+
+    # Same naming as the GUI, so both show the same crops and rows
+    pdf_name = os.path.basename(pdf_path).split('.')[0]
+    rules = get_rules(settings.rules_path)
+    raw_text_file = None
+    pages = 0
+    try:
+        if raw_text:
+            raw_text_file = open(f"{pdf_path}.txt", 'a' if start_page > 1 else 'w', encoding='utf-8')
+        with profile_run(stats, pdf_path, settings.profile_dir, settings.cprofile):
+            for record in iter_page_records(pdf_path, use_google, settings, start_page=start_page, stats=stats):
+                if raw_text_file is not None:
+                    raw_text_file.write(format_page_record(record))
+                    raw_text_file.flush()
+                with stats.stage("parse"):
+                    info = parse_page_record(record, rules)
+                info['pdf_name'] = pdf_name
+                info['pdf_file'] = os.path.basename(pdf_path)
+                info['page_num'] = record.page_num
+                # Earlier pages of this PDF are already stored, so this also finds repeats within it
+                with stats.stage("duplicates"):
+                    duplicate_of = store.duplicate_of(info)
+                if duplicate_of:
+                    stats.count("duplicates")
+                    print(f"{pdf_name} page {record.page_num}: possible {duplicate_of}")
+                with stats.stage("store"):
+                    store.add_page(pdf_path, info)
+                stats.page_done(record.page_num)
+                pages += 1
+                if stop is not None and stop.is_set():
+                    return pages
+    except Exception as e:
+        store.finish_job(pdf_path, error=e)
+        raise
+    finally:
+        if raw_text_file is not None:
+            raw_text_file.close()
+    store.finish_job(pdf_path)
+    return pages
+
+
+class BatchRunner:
+    """
+    A job queue of PDFs processed `jobs` at a time. OCR engines are shared
+    between the jobs (EasyOCR inference runs one call at a time, or on the
+    --workers pool), so extra jobs mainly overlap rendering and parsing of one
+    PDF with OCR of another.
+    """
+
+    def __init__(self, store, jobs=1, use_google=False, settings=None, raw_text=False):
+        self.store = store
+        self.use_google = use_google
+        self.settings = settings or PipelineSettings()
+        self.raw_text = raw_text
+        self.done = 0
+        self.skipped = 0
+        self.failed = []
+        self.stop = threading.Event()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max(1, jobs))
+
+    def submit(self, pdf_path):
+        return self._executor.submit(self._run, pdf_path)
+
+    def _run(self, pdf_path):
+        stats = PipelineStats()
+        try:
+            pages = process_pdf(self.store, pdf_path, self.use_google, self.settings, self.raw_text, self.stop, stats)
+        except Exception as e:
+            print(f"Failed {pdf_path}: {e}")
+            with self._lock:
+                self.failed.append(pdf_path)
+            return
+        with self._lock:
+            if pages is None:
+                self.skipped += 1
+                return
+            if self.stop.is_set():
+                return
+            self.done += 1
+        report = stats.report()
+        print(f"Finished {pdf_path}: {pages} pages in {report['wall_seconds']:.1f}s "
+              f"({report['pages_per_second'] or 0:.2f} pages/s)")
+
+    def run(self, pdf_paths):
+        for future in [self.submit(path) for path in pdf_paths]:
+            future.result()
+
+    def watch(self, directory, interval=5.0):
+        """
+        Processes PDFs as they appear in `directory`, until interrupted. A file
+        is picked up once its size and modification time stop changing between
+        two polls, so half-copied files are left alone.
+        """
+        print(f"Watching {directory} for PDFs (Ctrl+C to stop)...")
+        last_seen = {}
+        submitted = {}
+        while True:
+            for pdf_path in expand_inputs([directory]):
+                try:
+                    current = fingerprint(pdf_path)
+                except OSError:
+                    continue
+                if last_seen.get(pdf_path) == current and submitted.get(pdf_path) != current:
+                    submitted[pdf_path] = current
+                    self.submit(pdf_path)
+                last_seen[pdf_path] = current
+            time.sleep(interval)
+
+    def shutdown(self, interrupt=False):
+        """Waits for the queue to drain, or with `interrupt` only for the pages being OCR'd."""
+        if interrupt:
+            self.stop.set()
+        self._executor.shutdown(wait=True, cancel_futures=interrupt)
+
+    def summary(self):
+        return f"{self.done} processed, {self.skipped} skipped, {len(self.failed)} failed"
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Process scanned check PDFs without the GUI")
+    parser.add_argument("inputs", nargs="*", help="PDF files, glob patterns or directories")
+    parser.add_argument("--watch", metavar="DIR", help="keep processing PDFs that appear in DIR")
+    parser.add_argument("--interval", type=float, default=5.0, help="seconds between polls of --watch")
+    parser.add_argument("--jobs", type=int, default=1, help="PDFs processed at the same time")
+    parser.add_argument("--db", default=DEFAULT_DB_PATH, help="results store shared with the GUI")
+    parser.add_argument("--google", action="store_true", help="OCR with Google Vision")
+    parser.add_argument("--credentials", help="Google service account key (sets GOOGLE_APPLICATION_CREDENTIALS)")
+    parser.add_argument("--vision-endpoint", help="Vision REST endpoint, e.g. a fakevision.py server")
+    parser.add_argument("--backend", choices=["easyocr", "tesseract", "cascade"], default="easyocr")
+    parser.add_argument("--workers", type=int, default=1, help="EasyOCR worker processes")
+    parser.add_argument("--batch-size", type=int, default=1, help="pages OCR'd per batch")
+    parser.add_argument("--chunk-size", type=int, default=10, help="pages rendered at once")
+    parser.add_argument("--no-crops", action="store_true", help="don't archive crops for the GUI")
+    parser.add_argument("--crops-dir", default=DEFAULT_CROPS_DIR, help="crop archives shared with the GUI")
+    parser.add_argument("--raw-text", action="store_true", help="also write the raw OCR text to <pdf>.txt")
+    parser.add_argument("--profile-dir", help="save a JSON timing report of each PDF here")
+    parser.add_argument("--cprofile", action="store_true", help="also save cProfile stats to --profile-dir")
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if not args.inputs and not args.watch:
+        parser.error("give PDF files, globs or directories, or --watch DIR")
+    if args.cprofile and not args.profile_dir:
+        parser.error("--cprofile needs --profile-dir")
+    if args.credentials:
+        os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = args.credentials
+
+    settings = PipelineSettings(chunk_size=args.chunk_size, workers=args.workers, batch_size=args.batch_size,
+                                backend=args.backend, vision_endpoint=args.vision_endpoint,
+                                save_crops=not args.no_crops, crops_dir=args.crops_dir, profile_dir=args.profile_dir, cprofile=args.cprofile)
+    store = open_store(args.db)
+    runner = BatchRunner(store, args.jobs, args.google or bool(args.vision_endpoint), settings, args.raw_text)
+    try:
+        if args.inputs:
+            pdf_paths = expand_inputs(args.inputs)
+            print(f"Queued {len(pdf_paths)} PDFs.")
+            runner.run(pdf_paths)
+        if args.watch:
+            runner.watch(args.watch, args.interval)
+    except KeyboardInterrupt:
+        print("Interrupted, finishing the current pages; rerun the same command to resume.")
+        runner.shutdown(interrupt=True)
+    else:
+        runner.shutdown()
+    finally:
+        shutdown_pool()
+        store.close()
+    print(runner.summary())
+    return 1 if runner.failed else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
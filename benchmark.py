@@ -0,0 +1,328 @@
+"""
+Benchmarks the PDF -> fields pipeline on synthetic checks (see synthchecks.py)
+and flags regressions against a stored baseline.
+
+    python benchmark.py                                  # stub OCR, 50 pages
+    python benchmark.py --engines stub easyocr tesseract --noise 0 0.3
+    python benchmark.py --save-baseline                  # accept the current numbers
+    python benchmark.py --startup --engines              # only the GUI's time to first window
+
+The "stub" engine returns the printed text of each crop without running any
+OCR, so its cases measure pipeline overhead (rendering, crop archiving,
+parsing) on their own; --stub-latency adds a fixed OCR cost per crop. Every
+case runs in a fresh process so peak memory is its own. Exit status is 1 if
+any case regressed.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+
+from ocrbackend import OCRBackend
+from pipelinestats import percentile
+
+
+DEFAULT_BASELINE_PATH = 'benchmark_baseline.json'
+DEFAULT_WORKDIR = 'benchmark_data'
+# Seconds from launching main.py until its window is shown
+DEFAULT_STARTUP_TARGET = 2.0
+FIELDS = ("bank_name", "platite_racun_br", "broj_tekuceg_racuna", "serijski_broj")
+
+# Common OCR digit/letter mix-ups, used by the stub engine to imitate noise
+CONFUSIONS = {"0": "O", "1": "l", "2": "Z", "5": "S", "6": "b", "8": "B"}
+
+
+class StubEngine(OCRBackend):
+    """
+    Pretends to OCR the synthetic checks: returns the lines printed on each
+    crop, in order, optionally with OCR-like character confusions (`noise`)
+    and a fixed delay per crop (`latency`). Relies on crops arriving in page
+    order, so it must run in-process, without the OCR cache and, in a
+    cascade, only as the first tier. readtext_many() gets no region names and
+    takes the crops to follow `region_names` in turn, as ocr_pages() orders
+    them.
+    """
+
+    name = "stub"
+    version = "1"
+
+    def __init__(self, checks, noise=0.0, latency=0.0, seed=0, region_names=("upper", "lower")):
+        self.lines = {"upper": [check["upper"] for check in checks],
+                      "lower": [check["lower"] for check in checks]}
+        self.next_page = {"upper": 0, "lower": 0}
+        self.region_names = region_names
+        self.noise = noise
+        self.latency = latency
+        self.rng = random.Random(seed)
+        self.crops = 0
+
+    def counters(self):
+        return {"crops": self.crops}
+
+    def _garble(self, text):
+        rate = 0.1 * self.noise
+        return "".join(CONFUSIONS[char] if char in CONFUSIONS and self.rng.random() < rate else char
+                       for char in text)
+
+    def readtext_many(self, images, batch_size=1):
+        first = self.crops
+        regions = [self.region_names[(first + i) % len(self.region_names)] for i in range(len(images))]
+        return self.readtext_regions(images, regions, batch_size)
+
+    def readtext_regions(self, images, regions, batch_size=1):
+        results = []
+        for region in regions:
+            page = self.next_page[region]
+            self.next_page[region] += 1
+            results.append([(None, self._garble(line), 0.99 - 0.5 * self.noise * self.rng.random())
+                            for line in self.lines[region][page]])
+        self.crops += len(images)
+        if self.latency:
+            time.sleep(self.latency * len(images))
+        return results
+
+
+def case_name(case):
+    return (f"{case['engine']}-noise{case['noise']:g}-p{case['pages']}"
+            f"-b{case['batch_size']}-w{case['workers']}")
+
+
+def field_accuracy(records, checks):
+    """Share of pages where each field matches the ground truth exactly, plus 'all' fields together."""
+    hits = dict.fromkeys(FIELDS, 0)
+    all_hits = 0
+    for record, check in zip(records, checks):
+        matches = [record.get(field) == check["truth"][field] for field in FIELDS]
+        for field, match in zip(FIELDS, matches):
+            hits[field] += match
+        all_hits += all(matches)
+    pages = max(1, len(checks))
+    accuracy = {field: round(hits[field] / pages, 4) for field in FIELDS}
+    accuracy["all"] = round(all_hits / pages, 4)
+    return accuracy
+
+
+def run_case(case):
+    """Runs one case in this process and returns its metrics."""
+    from parsepdf import PipelineSettings, parse_from_pdf
+    from pipelinestats import PipelineStats
+    from synthchecks import load_truth, write_pdf
+
+    pdf_name = f"checks-p{case['pages']}-n{case['noise']:g}-s{case['seed']}.pdf"
+    if not os.path.exists(pdf_name + ".truth.json"):
+        write_pdf(pdf_name, case["pages"], case["noise"], case["seed"])
+    checks = load_truth(pdf_name)
+
+    engine = None
+    backend = case["engine"]
+    if backend == "stub":
+        engine = StubEngine(checks, case["noise"], case["stub_latency"], case["seed"])
+        backend = "easyocr"
+    settings = PipelineSettings(batch_size=case["batch_size"], workers=case["workers"], backend=backend,
+                                cache_path=None, save_crops=case["save_crops"])
+    stats = PipelineStats()
+    records = parse_from_pdf(pdf_name, settings=settings, engine=engine, stats=stats)
+    report = stats.report()
+    return {
+        "pages_per_second": report["pages_per_second"],
+        "page_seconds": report["page_seconds"],
+        "peak_rss_bytes": report["peak_rss_bytes"],
+        "wall_seconds": report["wall_seconds"],
+        "accuracy": field_accuracy(records, checks),
+        "stages": {name: stage["per_page"] for name, stage in report["stages"].items()},
+    }
+
+
+def run_case_in_subprocess(case, workdir):
+    os.makedirs(workdir, exist_ok=True)
+    command = [sys.executable, os.path.abspath(__file__), "--run-case", json.dumps(case)]
+    result = subprocess.run(command, cwd=workdir, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    lines = result.stdout.strip().splitlines()
+    if result.returncode != 0 or not lines:
+        error = (result.stderr.strip().splitlines() or ["no output"])[-1]
+        return {"error": error}
+    return json.loads(lines[-1])
+
+
+def run_startup(workdir, runs=3):
+    """
+    Launches the GUI with --time-to-window `runs` times (in `workdir`, so it
+    opens an empty store) and returns the median startup times: measured
+    from launch, including the interpreter, and from inside main.py.
+    Needs a display.
+    """
+    os.makedirs(workdir, exist_ok=True)
+    main_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "main.py")
+    launches, in_process, heavy_modules = [], [], set()
+    for _ in range(runs):
+        started = time.perf_counter()
+        process = subprocess.Popen([sys.executable, main_path, "--time-to-window"], cwd=workdir,
+                                   stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+        report = None
+        for line in process.stdout:
+            if line.startswith("{"):
+                launches.append(time.perf_counter() - started)
+                report = json.loads(line)
+                break
+        _, stderr = process.communicate()
+        if report is None:
+            return {"error": (stderr.strip().splitlines() or ["no output"])[-1]}
+        in_process.append(report["first_window_seconds"])
+        heavy_modules.update(report["heavy_modules"])
+    return {"first_window_seconds": percentile(launches, 0.5),
+            "first_window_in_process_seconds": percentile(in_process, 0.5),
+            "heavy_modules": sorted(heavy_modules)}
+
+
+# metric path, higher_is_better, tolerance kind
+CHECKS = [
+    (("pages_per_second",), True, "speed"),
+    (("page_seconds", "p95"), False, "speed"),
+    (("peak_rss_bytes",), False, "memory"),
+    (("first_window_seconds",), False, "speed"),
+] + [(("accuracy", field), True, "accuracy") for field in FIELDS + ("all",)]
+
+
+def _metric(result, path):
+    for key in path:
+        result = (result or {}).get(key)
+    return result
+
+
+def compare(results, baseline, speed_tolerance=0.15, memory_tolerance=0.25, accuracy_tolerance=0.01):
+    """
+    Regressions of `results` against `baseline` (both {case name: metrics}).
+    Speed and memory may get worse by a relative tolerance, accuracy by an
+    absolute one.
+    """
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get("cases", {}).get(name)
+        if not base or "error" in result:
+            continue
+        for path, higher_is_better, kind in CHECKS:
+            new, old = _metric(result, path), _metric(base, path)
+            if new is None or old is None:
+                continue
+            if kind == "accuracy":
+                worse = new < old - accuracy_tolerance
+            else:
+                tolerance = speed_tolerance if kind == "speed" else memory_tolerance
+                worse = new < old * (1 - tolerance) if higher_is_better else new > old * (1 + tolerance)
+            if worse:
+                regressions.append(f"{name}: {'.'.join(path)} {old} -> {new}")
+    return regressions
+
+
+def check_startup(result, target=DEFAULT_STARTUP_TARGET):
+    """Problems with a startup result that don't need a baseline: over target, heavy imports."""
+    problems = []
+    if "error" in result:
+        return problems
+    if result["first_window_seconds"] > target:
+        problems.append(f"startup: first window after {result['first_window_seconds']:.2f}s, target {target:.2f}s")
+    if result["heavy_modules"]:
+        problems.append(f"startup: {', '.join(result['heavy_modules'])} imported before the first window")
+    return problems
+
+
+def machine_info():
+    return {"platform": platform.platform(), "python": platform.python_version(), "cpus": os.cpu_count()}
+
+
+def format_result(name, result):
+    if "error" in result:
+        return f"{name:<40} ERROR {result['error']}"
+    if "first_window_seconds" in result:
+        return (f"{name:<40} first window {result['first_window_seconds']:.2f}s "
+                f"({result['first_window_in_process_seconds']:.2f}s in main.py)")
+    latency = result["page_seconds"]
+    rss = result["peak_rss_bytes"]
+    return (f"{name:<40} {result['pages_per_second'] or 0:8.2f} pages/s  "
+            f"p50 {latency['p50'] or 0:.3f}s p95 {latency['p95'] or 0:.3f}s p99 {latency['p99'] or 0:.3f}s  "
+            f"peak {rss / 2 ** 20 if rss else 0:.0f} MiB  accuracy {result['accuracy']['all']:.1%}")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Benchmark the check pipeline on synthetic PDFs")
+    parser.add_argument("--engines", nargs="*", default=["stub"], choices=["stub", "easyocr", "tesseract"])
+    parser.add_argument("--pages", type=int, default=50)
+    parser.add_argument("--noise", nargs="+", type=float, default=[0.0])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--batch-size", type=int, default=1)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--stub-latency", type=float, default=0.0, help="seconds of fake OCR per crop")
+    parser.add_argument("--no-crops", action="store_true", help="don't archive crops during the run")
+    parser.add_argument("--workdir", default=DEFAULT_WORKDIR, help="where PDFs and run artifacts go")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true", help="store these results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="allowed relative slowdown")
+    parser.add_argument("--startup", action="store_true", help="also time the GUI's first window (needs a display)")
+    parser.add_argument("--startup-target", type=float, default=DEFAULT_STARTUP_TARGET,
+                        help="seconds allowed until the first window")
+    parser.add_argument("--startup-runs", type=int, default=3)
+    parser.add_argument("--output", help="also write the results as JSON here")
+    parser.add_argument("--run-case", help=argparse.SUPPRESS)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.run_case:
+        print(json.dumps(run_case(json.loads(args.run_case))))
+        return 0
+
+    cases = [{"engine": engine, "noise": noise, "pages": args.pages, "seed": args.seed,
+              "batch_size": args.batch_size, "workers": args.workers,
+              "stub_latency": args.stub_latency, "save_crops": not args.no_crops}
+             for engine in args.engines for noise in args.noise]
+    results = {}
+    for case in cases:
+        name = case_name(case)
+        results[name] = run_case_in_subprocess(case, args.workdir)
+        print(format_result(name, results[name]))
+    problems = []
+    if args.startup:
+        results["startup"] = run_startup(args.workdir, args.startup_runs)
+        print(format_result("startup", results["startup"]))
+        problems += check_startup(results["startup"], args.startup_target)
+    for problem in problems:
+        print(f"REGRESSION {problem}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({"machine": machine_info(), "cases": results}, f, indent=2)
+
+    if args.save_baseline:
+        baseline = {"machine": machine_info(), "cases": {}}
+        if os.path.exists(args.baseline):
+            with open(args.baseline, encoding='utf-8') as f:
+                baseline = json.load(f)
+            baseline["machine"] = machine_info()
+        baseline["cases"].update({name: result for name, result in results.items() if "error" not in result})
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(baseline, f, indent=2)
+        print(f"Saved baseline to {args.baseline}")
+        return 1 if problems else 0
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --save-baseline to create one.")
+        return 1 if problems else 0
+    with open(args.baseline, encoding='utf-8') as f:
+        baseline = json.load(f)
+    if baseline.get("machine", {}).get("platform") != machine_info()["platform"]:
+        print("Note: the baseline was recorded on a different machine; speed and memory may not compare.")
+    regressions = compare(results, baseline, speed_tolerance=args.tolerance)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    if not regressions:
+        print("No regressions against the baseline.")
+    return 1 if regressions or problems else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
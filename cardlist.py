@@ -0,0 +1,285 @@
+import sys
+from collections import OrderedDict
+
+import customtkinter as ctk
+
+
+# (title, column) of the editable fields in each card
+OCR_FIELDS = [
+    ("Bank Name:", "bank_name"),
+    ("Platite Račun Br:", "platite_racun_br"),
+    ("Broj Tekućeg Računa:", "broj_tekuceg_racuna"),
+    ("Serijski Broj:", "serijski_broj"),
+]
+MANUAL_FIELDS = [
+    ("Datum Dospeća:", "datum_dospeca"),
+    ("Iznos:", "iznos"),
+    ("Radna Jedinica:", "radna_jedinica"),
+]
+
+CARD_SPACING = 15
+FETCH_SIZE = 50
+# Fetched blocks of FETCH_SIZE rows kept around the viewport, least recently used dropped first
+CACHED_BLOCKS = 4
+# Header and border colour of cards whose check is stored more than once
+DUPLICATE_COLOR = "#E8A33D"
+# OCR fields read with a confidence below this get a border of LOW_CONFIDENCE_COLOR
+LOW_CONFIDENCE = 0.5
+LOW_CONFIDENCE_COLOR = "#D9534F"
+
+
+class DataCard(ctk.CTkFrame):
+    """
+    The 'card' for one row of data. Its widgets are built once and then
+    re-bound to other rows while the list scrolls.
+    - on_edit(row_id, column, value) is called when a field was changed.
+    - on_show_image(row, region) is called by the image buttons.
+    """
+
+    def __init__(self, master, on_edit, on_show_image):
+        super().__init__(master, border_width=2)
+        self.on_edit = on_edit
+        self.on_show_image = on_show_image
+        self.row = None
+        self.entries = {}
+        self.grid_columnconfigure(0, weight=1)
+
+        # --- Card Header ---
+        self.header_label = ctk.CTkLabel(self, text="", font=ctk.CTkFont(size=16, weight="bold"), anchor="w")
+        self.header_label.grid(row=0, column=0, padx=15, pady=(10, 5), sticky="ew")
+        self._header_color = self.header_label.cget("text_color")
+        self._border_color = self.cget("border_color")
+
+        # --- Main content frame with 2 columns ---
+        content_frame = ctk.CTkFrame(self, fg_color="transparent")
+        content_frame.grid(row=1, column=0, padx=5, pady=5, sticky="ew")
+        content_frame.grid_columnconfigure((0, 1), weight=1)
+
+        # --- Left Column: OCR Data ---
+        ocr_frame = ctk.CTkFrame(content_frame)
+        ocr_frame.grid(row=0, column=0, padx=10, pady=5, sticky="nsew")
+        ocr_frame.grid_columnconfigure(0, weight=1)
+        ctk.CTkLabel(ocr_frame, text="OCR Data", font=ctk.CTkFont(weight="bold")).pack(pady=(5, 10))
+        for title, col_name in OCR_FIELDS:
+            self.create_entry_field(ocr_frame, title, col_name).pack(fill="x", expand=True, padx=10, pady=5)
+
+        # --- Right Column: Manual Input & Verification ---
+        right_column_frame = ctk.CTkFrame(content_frame, fg_color="transparent")
+        right_column_frame.grid(row=0, column=1, padx=10, pady=5, sticky="nsew")
+        right_column_frame.grid_columnconfigure(0, weight=1)
+
+        manual_frame = ctk.CTkFrame(right_column_frame)
+        manual_frame.grid(row=0, column=0, sticky="nsew")
+        manual_frame.grid_columnconfigure(0, weight=1)
+        ctk.CTkLabel(manual_frame, text="Manual Input", font=ctk.CTkFont(weight="bold")).pack(pady=(5, 10))
+        for title, col_name in MANUAL_FIELDS:
+            self.create_entry_field(manual_frame, title, col_name).pack(fill="x", expand=True, padx=10, pady=5)
+
+        # --- Image Buttons ---
+        image_frame = ctk.CTkFrame(right_column_frame)
+        image_frame.grid(row=1, column=0, sticky="nsew", pady=(10, 0))
+        image_frame.grid_columnconfigure((0, 1), weight=1)
+        ctk.CTkLabel(image_frame, text="Image Verification", font=ctk.CTkFont(weight="bold")).grid(row=0, column=0,
+                                                                                                   columnspan=2,
+                                                                                                   pady=(5, 10))
+        upper_button = ctk.CTkButton(image_frame, text="Show Upper Image",
+                                     command=lambda: self.show_image("upper"))
+        upper_button.grid(row=1, column=0, padx=5, pady=5, sticky="ew")
+        lower_button = ctk.CTkButton(image_frame, text="Show Lower Image",
+                                     command=lambda: self.show_image("lower"))
+        lower_button.grid(row=1, column=1, padx=5, pady=5, sticky="ew")
+
+    def create_entry_field(self, parent, title, col_name):
+        """Creates a self-contained, editable entry field that saves on focus out."""
+        # This frame isolates the label and entry from the parent's layout manager
+        field_frame = ctk.CTkFrame(parent, fg_color="transparent")
+
+        label = ctk.CTkLabel(field_frame, text=title, font=ctk.CTkFont(size=12))
+        label.pack(fill="x", padx=5, pady=(0, 2))
+
+        entry = ctk.CTkEntry(field_frame)
+        entry.pack(fill="x", expand=True, padx=5)
+        entry.bind("<FocusOut>", lambda event, name=col_name: self.save_field(name))
+        self.entries[col_name] = entry
+        self._entry_border_color = entry.cget("border_color")
+
+        return field_frame
+
+    def save_field(self, col_name):
+        if self.row is None:
+            return
+        new_value = self.entries[col_name].get()
+        if new_value != str(self.row.get(col_name) or ""):
+            self.row[col_name] = new_value
+            # A value typed in by hand no longer needs a second look
+            self.row.get("confidence", {}).pop(col_name, None)
+            self.entries[col_name].configure(border_color=self._entry_border_color)
+            self.on_edit(self.row["id"], col_name, new_value)
+
+    def save_fields(self):
+        for col_name in self.entries:
+            self.save_field(col_name)
+
+    def bind_row(self, row):
+        """Shows `row` in this card, first saving any pending edit of the previous row."""
+        if row is self.row:
+            return
+        self.save_fields()
+        self.row = row
+        header = f"Source: {row.get('pdf_name', 'N/A')}  |  Page: {row.get('page_num', 0)}"
+        duplicate_of = row.get("duplicate_of")
+        if duplicate_of:
+            header += f"  |  Possible {duplicate_of}"
+        self.header_label.configure(text=header, text_color=DUPLICATE_COLOR if duplicate_of else self._header_color)
+        self.configure(border_color=DUPLICATE_COLOR if duplicate_of else self._border_color)
+        confidence = row.get("confidence") or {}
+        for col_name, entry in self.entries.items():
+            entry.delete(0, "end")
+            entry.insert(0, str(row.get(col_name) or ""))
+            doubtful = row.get(col_name) and (confidence.get(col_name) is not None
+                                              and confidence[col_name] < LOW_CONFIDENCE)
+            entry.configure(border_color=LOW_CONFIDENCE_COLOR if doubtful else self._entry_border_color)
+
+    def show_image(self, region):
+        if self.row is not None:
+            self.on_show_image(self.row, region)
+
+
+class VirtualCardList(ctk.CTkFrame):
+    """
+    A scrollable list of DataCards that only has widgets for the rows in view.
+    Just enough cards to fill the viewport (plus one) are created; scrolling
+    re-binds them to other rows instead of creating new widgets. Rows are
+    pulled on demand through fetch_rows(offset, limit) and the list length
+    through row_count(), so neither startup nor appending rows depends on
+    how many rows exist. Only the last few fetched blocks are kept, so memory
+    stays flat however far the list is scrolled.
+    """
+
+    def __init__(self, master, row_count, fetch_rows, on_edit, on_show_image, label_text=""):
+        super().__init__(master)
+        self.row_count = row_count
+        self.fetch_rows = fetch_rows
+        self.on_edit = on_edit
+        self.on_show_image = on_show_image
+        self.count = 0
+        self.offset = 0  # scroll position in pixels
+        self.row_height = None
+        self.blocks = OrderedDict()  # first index -> list of FETCH_SIZE row dicts, LRU order
+        self.cards = []
+
+        self.grid_columnconfigure(0, weight=1)
+        self.grid_rowconfigure(1, weight=1)
+        ctk.CTkLabel(self, text=label_text).grid(row=0, column=0, columnspan=2, pady=(5, 0))
+        self.viewport = ctk.CTkFrame(self, fg_color="transparent")
+        self.viewport.grid(row=1, column=0, sticky="nsew", padx=(10, 0), pady=10)
+        self.scrollbar = ctk.CTkScrollbar(self, command=self.on_scrollbar)
+        self.scrollbar.grid(row=1, column=1, sticky="ns", pady=10)
+
+        self.viewport.bind("<Configure>", lambda event: self.render())
+        for sequence in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+            self.bind_all(sequence, self._on_mousewheel, add="+")
+
+    # --- Data ---
+
+    def reload(self):
+        """Forgets every loaded row and shows the list from the current data."""
+        self._drop_blocks()
+        for card in self.cards:
+            card.row = None
+        self.count = self.row_count()
+        self.render()
+
+    def rows_appended(self, scroll_to_end=True):
+        """
+        Shows rows that were added at the end. Cached rows are fetched again,
+        since new rows can change their duplicate flags, but the cards are
+        kept.
+        """
+        self._drop_blocks()
+        self.count = self.row_count()
+        if scroll_to_end:
+            self.offset = self.max_offset()
+        self.render()
+
+    def _drop_blocks(self):
+        # Pending edits are saved first, so the rows fetched next include them
+        for card in self.cards:
+            card.save_fields()
+        self.blocks.clear()
+
+    def row_at(self, index):
+        start = index - index % FETCH_SIZE
+        block = self.blocks.get(start)
+        if block is None:
+            block = self.blocks[start] = self.fetch_rows(start, FETCH_SIZE)
+            while len(self.blocks) > CACHED_BLOCKS:
+                self.blocks.popitem(last=False)
+        else:
+            self.blocks.move_to_end(start)
+        return block[index - start] if index - start < len(block) else None
+
+    # --- Layout ---
+
+    def max_offset(self):
+        if not self.row_height:
+            return 0
+        return max(0, self.count * self.row_height - self.viewport.winfo_height())
+
+    def _ensure_cards(self):
+        if self.row_height is None:
+            card = DataCard(self.viewport, self.on_edit, self.on_show_image)
+            card.update_idletasks()
+            self.row_height = card.winfo_reqheight() + CARD_SPACING
+            self.cards.append(card)
+        needed = self.viewport.winfo_height() // self.row_height + 2
+        while len(self.cards) < needed:
+            self.cards.append(DataCard(self.viewport, self.on_edit, self.on_show_image))
+
+    def render(self):
+        self._ensure_cards()
+        self.offset = min(max(self.offset, 0), self.max_offset())
+        first_index = self.offset // self.row_height
+        top = -(self.offset % self.row_height)
+        for slot, card in enumerate(self.cards):
+            index = first_index + slot
+            row = self.row_at(index) if index < self.count else None
+            if row is None:
+                card.place_forget()
+                continue
+            card.bind_row(row)
+            card.place(x=0, y=top + slot * self.row_height, relwidth=1)
+
+        total = self.count * self.row_height
+        if total <= 0:
+            self.scrollbar.set(0, 1)
+        else:
+            view = self.viewport.winfo_height()
+            self.scrollbar.set(self.offset / total, min(1, (self.offset + view) / total))
+
+    # --- Scrolling ---
+
+    def scroll_by(self, pixels):
+        self.offset += pixels
+        self.render()
+
+    def on_scrollbar(self, action, amount, unit=None):
+        if action == "moveto":
+            self.offset = int(float(amount) * self.count * (self.row_height or 0))
+            self.render()
+        elif action == "scroll":
+            step = self.viewport.winfo_height() if unit == "pages" else (self.row_height or 0) // 4
+            self.scroll_by(int(amount) * step)
+
+    def _on_mousewheel(self, event):
+        if not str(event.widget).startswith(str(self)):
+            return
+        if event.num == 4:
+            delta = -1
+        elif event.num == 5:
+            delta = 1
+        elif sys.platform == "darwin":
+            delta = -event.delta
+        else:
+            delta = -int(event.delta / 120)
+        self.scroll_by(delta * (self.row_height or 0) // 4)
@@ -0,0 +1,184 @@
+import json
+import os
+import re
+import threading
+from bisect import bisect_right
+from collections import namedtuple
+
+
+DEFAULT_RULES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'check_rules.json')
+
+FIELDS = ("bank_name", "platite_racun_br", "broj_tekuceg_racuna", "serijski_broj")
+
+# One OCR'd word/line: text, confidence in [0, 1] (None if the backend has
+# none) and its bounding box in crop pixels (None if unknown).
+Token = namedtuple("Token", ["text", "confidence", "bbox"])
+
+
+def _trie_pattern(words):
+    """
+    Builds one regex that matches any of `words`, factored into a prefix trie
+    (e.g. "ab|ac" -> "a(?:b|c)"). The regex engine then walks the trie once per
+    text position instead of trying every word, so adding words barely changes
+    the matching cost.
+    """
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = {}
+
+    def build(node):
+        if list(node) == ['']:
+            return ''
+        optional = '' in node
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        pattern = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        if optional:
+            pattern = '(?:' + pattern + ')?'
+        return pattern
+
+    return build(trie)
+
+
+class _TokenSpans:
+    """Maps character offsets of the joined region text back to OCR tokens."""
+
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.starts = []
+        texts = []
+        offset = 0
+        for token in tokens:
+            self.starts.append(offset)
+            texts.append(token.text)
+            offset += len(token.text) + 1
+        self.text = "\n".join(texts)
+
+    def confidence(self, *spans):
+        """Lowest OCR confidence among the tokens the spans touch (None if unknown)."""
+        confidences = []
+        for start, end in spans:
+            first = bisect_right(self.starts, start) - 1
+            last = bisect_right(self.starts, max(start, end - 1)) - 1
+            for token in self.tokens[max(first, 0):last + 1]:
+                if token.confidence is not None:
+                    confidences.append(token.confidence)
+        return min(confidences) if confidences else None
+
+
+class CheckRules:
+    """
+    Field extraction rules for one check, compiled once from a config dict
+    (see check_rules.json):
+    - banks: canonical bank names and the aliases OCR may produce for them,
+      all matched case-insensitively by a single trie-shaped regex.
+    - platite_account_pattern: format of the "Platite" account in the upper part.
+    - lower_number_pattern: what counts as a number in the lower part.
+    - account_prefixes: bank prefixes that mark a lower number as the
+      "tekući račun" rather than the serial number.
+    """
+
+    def __init__(self, config):
+        self.bank_names = {}
+        for bank in config["banks"]:
+            for alias in bank.get("aliases") or [bank["name"]]:
+                self.bank_names[alias.lower()] = bank["name"]
+        self.bank_pattern = re.compile(_trie_pattern(sorted(self.bank_names)), re.IGNORECASE)
+        # re.IGNORECASE folds more than str.lower() (e.g. 'İ', 'ı', 'ſ'), so a
+        # match missing from bank_names is resolved by matching it per bank.
+        self._bank_patterns = [(re.compile(_trie_pattern(sorted({alias.lower() for alias in bank.get("aliases")
+                                                                  or [bank["name"]]})), re.IGNORECASE),
+                                bank["name"]) for bank in config["banks"]]
+        self.platite_pattern = re.compile(config["platite_account_pattern"])
+        self.number_pattern = re.compile(config["lower_number_pattern"])
+        self.account_prefixes = tuple(config["account_prefixes"])
+
+    @classmethod
+    def from_file(cls, path=DEFAULT_RULES_PATH):
+        with open(path, encoding='utf-8') as f:
+            return cls(json.load(f))
+
+    def bank_name(self, matched_text):
+        """Canonical name of the bank whose alias bank_pattern matched as `matched_text`."""
+        name = self.bank_names.get(matched_text.lower())
+        if name is None:
+            name = next(name for pattern, name in self._bank_patterns if pattern.fullmatch(matched_text))
+        return name
+
+    def _extract(self, upper_text, lower_text):
+        """Returns {field: (value, [spans], region)} for the fields that were found."""
+        found = {}
+
+        # --- 1. Process the Upper Part ---
+        match = self.bank_pattern.search(upper_text)
+        if match:
+            found["bank_name"] = (self.bank_name(match.group(0)), [match.span()], 0)
+
+        # "Platite" number is always in the upper part
+        match = self.platite_pattern.search(upper_text)
+        if match:
+            found["platite_racun_br"] = (match.group(0), [match.span()], 0)
+
+        # --- 2. Process the Lower Part ---
+        numbers = [(match.group(0), match.span()) for match in self.number_pattern.finditer(lower_text)]
+
+        final_numbers = []
+        if len(numbers) == 3:
+            # Rule: If there are 3 numbers, concatenate the 2nd and 3rd
+            final_numbers = [(numbers[0][0], [numbers[0][1]]),
+                             (numbers[1][0] + numbers[2][0], [numbers[1][1], numbers[2][1]])]
+        elif len(numbers) == 2:
+            final_numbers = [(value, [span]) for value, span in numbers]
+        elif len(numbers) == 1:
+            # If only one number is found in the lower part, we'll assume it's the serial number
+            found["serijski_broj"] = (numbers[0][0], [numbers[0][1]], 1)
+
+        # Assign the two final numbers to the correct fields
+        if len(final_numbers) == 2:
+            (num1, spans1), (num2, spans2) = final_numbers
+            # Heuristic: The number with a hyphen or a known bank prefix is the "tekući račun"
+            if '-' in num1 or num1.startswith(self.account_prefixes):
+                found["broj_tekuceg_racuna"] = (num1, spans1, 1)
+                found["serijski_broj"] = (num2, spans2, 1)
+            else:
+                found["broj_tekuceg_racuna"] = (num2, spans2, 1)
+                found["serijski_broj"] = (num1, spans1, 1)
+
+        return found
+
+    def parse_text(self, upper_text, lower_text):
+        """Parses the plain text of the upper and lower part into the check fields."""
+        info = dict.fromkeys(FIELDS)
+        for field, (value, _, _) in self._extract(upper_text, lower_text).items():
+            info[field] = value
+        return info
+
+    def parse_tokens(self, upper_tokens, lower_tokens):
+        """
+        Parses the OCR tokens of the upper and lower part.
+        Returns (info, confidence): confidence holds, per field, the lowest OCR
+        confidence of the tokens the value was read from; 0.0 if the field was
+        not found and None if the backend gave no confidences.
+        """
+        regions = (_TokenSpans(upper_tokens), _TokenSpans(lower_tokens))
+        info = dict.fromkeys(FIELDS)
+        confidence = dict.fromkeys(FIELDS, 0.0)
+        for field, (value, spans, region) in self._extract(regions[0].text, regions[1].text).items():
+            info[field] = value
+            confidence[field] = regions[region].confidence(*spans)
+        return info, confidence
+
+
+_rules = {}
+_rules_lock = threading.Lock()
+
+
+def get_rules(path=DEFAULT_RULES_PATH):
+    """Returns the compiled rules for `path`, loading them once."""
+    with _rules_lock:
+        rules = _rules.get(path)
+        if rules is None:
+            rules = _rules[path] = CheckRules.from_file(path)
+        return rules
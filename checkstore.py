@@ -0,0 +1,373 @@
+import csv
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from dupindex import KEY_FIELDS, describe, duplicate_keys
+
+
+DEFAULT_DB_PATH = 'results.db'
+# PRAGMA user_version of the current schema; older stores are upgraded on open
+# (2: fuzzy keys no longer fold digits into each other)
+SCHEMA_VERSION = 2
+
+# pdf_file is the PDF's real file name (pdf_name drops everything from the
+# first dot), which its crop archive is named after; pdf_path is the
+# absolute path it was processed from, which ties the row to its batch job.
+COLUMNS = [
+    "pdf_name", "page_num", "bank_name", "platite_racun_br",
+    "broj_tekuceg_racuna", "serijski_broj", "datum_dospeca",
+    "iznos", "radna_jedinica", "pdf_file", "pdf_path"
+]
+
+
+class CheckStore:
+    """
+    SQLite (WAL) store of every processed check, one row per page.
+    Edits touch a single row and inserts append, so the cost of a write does
+    not depend on how many checks are stored. Rows are read in pages with
+    fetch()/iter_rows() instead of loading everything up front. The old
+    results.csv format can be imported and exported.
+    Batch runs also keep a `jobs` table with the last page committed for each
+    PDF, written in the same transaction as the page's row, so an interrupted
+    run can resume at the next page.
+    The OCR confidence of each parsed field, when known, is kept next to its
+    row in `field_confidence` and returned as row['confidence']; editing a
+    field drops its confidence, since the value was then checked by hand.
+    Every row is also indexed under its dupindex keys (serial number + account,
+    exact and fuzzy), kept up to date by inserts and edits, so finding the
+    duplicates of a check is one index lookup however many checks are stored.
+    Stores from before the index, or from before its keys last changed, need
+    rebuild_duplicate_index() once.
+    """
+
+    def __init__(self, path=DEFAULT_DB_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        column_defs = {col: f"{col} INTEGER NOT NULL DEFAULT 0" if col == "page_num"
+                       else f"{col} TEXT NOT NULL DEFAULT ''" for col in COLUMNS}
+        with self._conn:
+            self._conn.execute(f"CREATE TABLE IF NOT EXISTS checks (id INTEGER PRIMARY KEY, "
+                               f"{', '.join(column_defs.values())})")
+            # Stores from before a column was added get it with its default
+            existing = {row[1] for row in self._conn.execute("PRAGMA table_info(checks)")}
+            for col in COLUMNS:
+                if col not in existing:
+                    self._conn.execute(f"ALTER TABLE checks ADD COLUMN {column_defs[col]}")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS checks_pdf_path ON checks (pdf_path)")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS jobs (pdf_path TEXT PRIMARY KEY, fingerprint TEXT NOT NULL, "
+                               "status TEXT NOT NULL, pages_done INTEGER NOT NULL DEFAULT 0, "
+                               "error TEXT NOT NULL DEFAULT '', updated REAL NOT NULL)")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS duplicate_keys (key TEXT NOT NULL, row_id INTEGER NOT NULL, "
+                               "PRIMARY KEY (key, row_id)) WITHOUT ROWID")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS duplicate_keys_row ON duplicate_keys (row_id)")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS field_confidence (row_id INTEGER PRIMARY KEY, "
+                               "confidence TEXT NOT NULL)")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+            # A new store has nothing to index
+            if not self._conn.execute("SELECT 1 FROM checks LIMIT 1").fetchone():
+                self._conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    @staticmethod
+    def _clean(record, col):
+        value = record.get(col)
+        if value is None or value != value:  # None or NaN
+            return 0 if col == "page_num" else ""
+        return int(value) if col == "page_num" else str(value)
+
+    def _insert(self, record):
+        """Inserts one record and indexes it; the caller holds the lock and the transaction."""
+        values = [self._clean(record, col) for col in COLUMNS]
+        cursor = self._conn.execute(f"INSERT INTO checks ({', '.join(COLUMNS)}) "
+                                    f"VALUES ({', '.join('?' for _ in COLUMNS)})", values)
+        self._index_row(cursor.lastrowid, dict(zip(COLUMNS, values)))
+        if record.get("confidence"):
+            self._conn.execute("INSERT INTO field_confidence (row_id, confidence) VALUES (?, ?)",
+                               (cursor.lastrowid, json.dumps(record["confidence"])))
+        return cursor.lastrowid
+
+    def _index_row(self, row_id, record):
+        self._conn.executemany("INSERT OR IGNORE INTO duplicate_keys (key, row_id) VALUES (?, ?)",
+                               [(f"{kind}:{key}", row_id) for kind, key in duplicate_keys(record)])
+
+    def duplicate_index_ready(self):
+        """False for a store from before the duplicate index until rebuild_duplicate_index() has run."""
+        with self._lock:
+            return self._conn.execute("PRAGMA user_version").fetchone()[0] >= SCHEMA_VERSION
+
+    def rebuild_duplicate_index(self, chunk_size=1000):
+        """
+        Indexes every stored row again, `chunk_size` rows per transaction so
+        other calls get the lock in between; rows inserted or edited meanwhile
+        are indexed by those calls. Needed once for a store from before the
+        index, or from before its keys last changed.
+        """
+        last_id = 0
+        while True:
+            with self._lock, self._conn:
+                rows = self._conn.execute(f"SELECT id, {', '.join(KEY_FIELDS)} FROM checks WHERE id > ? "
+                                          f"ORDER BY id LIMIT ?", (last_id, chunk_size)).fetchall()
+                self._conn.executemany("DELETE FROM duplicate_keys WHERE row_id = ?", [(row[0],) for row in rows])
+                for row in rows:
+                    self._index_row(row[0], dict(zip(KEY_FIELDS, row[1:])))
+                if not rows:
+                    self._conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+                    return
+            last_id = rows[-1][0]
+
+    def insert_many(self, records):
+        """Appends records (dicts keyed by COLUMNS) and returns their row ids."""
+        with self._lock, self._conn:
+            return [self._insert(record) for record in records]
+
+    def update_cell(self, row_id, column, value):
+        """Sets one field of one row. Returns False if the value was already stored."""
+        if column not in COLUMNS:
+            raise ValueError(f"Unknown column: {column}")
+        with self._lock, self._conn:
+            cursor = self._conn.execute(f"UPDATE checks SET {column} = ? WHERE id = ? AND {column} IS NOT ?",
+                                        (value, row_id, value))
+            if cursor.rowcount > 0 and column in KEY_FIELDS:
+                self._conn.execute("DELETE FROM duplicate_keys WHERE row_id = ?", (row_id,))
+                row = self._conn.execute(f"SELECT {', '.join(KEY_FIELDS)} FROM checks WHERE id = ?",
+                                         (row_id,)).fetchone()
+                self._index_row(row_id, dict(zip(KEY_FIELDS, row)))
+            if cursor.rowcount > 0:
+                stored = self._conn.execute("SELECT confidence FROM field_confidence WHERE row_id = ?",
+                                            (row_id,)).fetchone()
+                confidence = json.loads(stored[0]) if stored else {}
+                if confidence.pop(column, None) is not None:
+                    self._conn.execute("UPDATE field_confidence SET confidence = ? WHERE row_id = ?",
+                                       (json.dumps(confidence), row_id))
+        return cursor.rowcount > 0
+
+    def find_duplicates(self, record, before_id=None, limit=5):
+        """
+        Stored rows that look like the same check as `record`, as dicts with
+        id, pdf_name, page_num and match ('exact' or 'fuzzy'), oldest first
+        and exact matches before fuzzy ones. For a stored record, `before_id`
+        (its own id) limits the search to earlier rows, so only the later
+        copies of a check are flagged, never the original.
+        """
+        matches = []
+        seen = set()
+        with self._lock:
+            for kind, key in duplicate_keys(record):
+                rows = self._conn.execute("SELECT c.id, c.pdf_name, c.page_num FROM duplicate_keys d "
+                                          "JOIN checks c ON c.id = d.row_id "
+                                          "WHERE d.key = ? AND d.row_id < ? ORDER BY d.row_id LIMIT ?",
+                                          (f"{kind}:{key}", before_id if before_id is not None else 2 ** 63 - 1,
+                                           limit)).fetchall()
+                for row_id, pdf_name, page_num in rows:
+                    if row_id not in seen:
+                        seen.add(row_id)
+                        matches.append({"id": row_id, "pdf_name": pdf_name, "page_num": page_num, "match": kind})
+        return matches[:limit]
+
+    def duplicate_of(self, record, before_id=None):
+        """A short description of the first earlier copy of `record`, or '' if it has none."""
+        matches = self.find_duplicates(record, before_id, limit=1)
+        return describe(matches[0]) if matches else ""
+
+    def _flag_duplicates(self, rows):
+        for row in rows:
+            row["duplicate_of"] = self.duplicate_of(row, before_id=row["id"])
+        return rows
+
+    def count(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM checks").fetchone()[0]
+
+    def get(self, row_id):
+        rows = self._select("WHERE id = ?", (row_id,))
+        return rows[0] if rows else None
+
+    def fetch(self, offset, limit):
+        """
+        Returns up to `limit` rows, in insertion order, starting at position
+        `offset`. Each row's 'duplicate_of' describes an earlier row with the
+        same check, or is ''.
+        """
+        return self._flag_duplicates(self._select("ORDER BY id LIMIT ? OFFSET ?", (limit, offset)))
+
+    def iter_rows(self, chunk_size=500):
+        last_id = 0
+        while True:
+            rows = self._select("WHERE id > ? ORDER BY id LIMIT ?", (last_id, chunk_size))
+            if not rows:
+                return
+            yield from self._flag_duplicates(rows)
+            last_id = rows[-1]["id"]
+
+    def _select(self, clause, params):
+        with self._lock:
+            cursor = self._conn.execute(f"SELECT id, {', '.join(COLUMNS)}, f.confidence FROM checks "
+                                        f"LEFT JOIN field_confidence f ON f.row_id = checks.id {clause}", params)
+            rows = cursor.fetchall()
+        return [dict(zip(["id"] + COLUMNS, row[:-1]), confidence=json.loads(row[-1]) if row[-1] else {})
+                for row in rows]
+
+    # --- CSV import/export ---
+
+    @staticmethod
+    def _import_key(csv_path):
+        return f"csv_import:{os.path.abspath(csv_path)}"
+
+    def import_progress(self, csv_path):
+        """(rows imported, finished) of the import of `csv_path`, or None if it never started."""
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (self._import_key(csv_path),)).fetchone()
+        if row is None:
+            return None
+        progress = json.loads(row[0])
+        return progress["rows"], progress["done"]
+
+    def needs_import(self, csv_path):
+        """
+        True if `csv_path` exists and was not imported completely yet. A store
+        with rows but no record of an import (from before imports were
+        tracked, or filled by processing) is left alone.
+        """
+        if not os.path.exists(csv_path):
+            return False
+        progress = self.import_progress(csv_path)
+        if progress is None:
+            return self.count() == 0
+        return not progress[1]
+
+    def _import_chunk(self, csv_path, chunk, imported, done):
+        """Inserts a chunk of CSV rows and records the import's progress in the same transaction."""
+        with self._lock, self._conn:
+            for record in chunk:
+                self._insert(record)
+            self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                               (self._import_key(csv_path), json.dumps({"rows": imported + len(chunk),
+                                                                        "done": done})))
+        return imported + len(chunk)
+
+    def import_csv(self, csv_path, chunk_size=1000, on_rows=None):
+        """
+        Appends the rows of a results.csv file, `chunk_size` rows per
+        transaction, and returns the number of rows imported. `on_rows(n)` is
+        called after each chunk, so a caller can show rows while the rest load.
+        Each chunk commits together with the number of rows imported so far,
+        so an import that was cut short continues after its last chunk when
+        called again; needs_import() tells whether it has finished.
+        """
+        progress = self.import_progress(csv_path)
+        if progress is not None and progress[1]:
+            return 0
+        skip = imported = progress[0] if progress is not None else 0
+        chunk = []
+        with open(csv_path, newline='', encoding='utf-8') as f:
+            for index, row in enumerate(csv.DictReader(f)):
+                if index < skip:
+                    continue
+                row = {col: (row.get(col) or None) for col in COLUMNS}
+                if row["page_num"] is not None:
+                    row["page_num"] = int(float(row["page_num"]))
+                chunk.append(row)
+                if len(chunk) >= chunk_size:
+                    imported = self._import_chunk(csv_path, chunk, imported, done=False)
+                    chunk = []
+                    if on_rows is not None:
+                        on_rows(imported - skip)
+        imported = self._import_chunk(csv_path, chunk, imported, done=True)
+        if on_rows is not None and chunk:
+            on_rows(imported - skip)
+        return imported - skip
+
+    def export_csv(self, csv_path):
+        """
+        Writes every row to `csv_path` in the results.csv layout, plus a
+        duplicate_of column. Refuses to overwrite a CSV whose import has not
+        finished, since its remaining rows would be lost.
+        """
+        progress = self.import_progress(csv_path)
+        if progress is not None and not progress[1]:
+            raise RuntimeError(f"{csv_path} has not been fully imported yet; export after the import finishes")
+        with open(csv_path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=COLUMNS + ["duplicate_of"], extrasaction='ignore')
+            writer.writeheader()
+            writer.writerows(self.iter_rows())
+        print(f"Data saved to {csv_path}")
+
+    # --- Batch jobs ---
+
+    def get_job(self, pdf_path):
+        """The job row of `pdf_path` as a dict, or None if it was never started."""
+        with self._lock:
+            row = self._conn.execute("SELECT pdf_path, fingerprint, status, pages_done, error, updated "
+                                     "FROM jobs WHERE pdf_path = ?", (pdf_path,)).fetchone()
+        if row is None:
+            return None
+        return dict(zip(["pdf_path", "fingerprint", "status", "pages_done", "error", "updated"], row))
+
+    def _delete_rows_of(self, pdf_path):
+        """Deletes the rows processed from `pdf_path`; the caller holds the lock and the transaction."""
+        for table, column in (("duplicate_keys", "row_id"), ("field_confidence", "row_id")):
+            self._conn.execute(f"DELETE FROM {table} WHERE {column} IN "
+                               f"(SELECT id FROM checks WHERE pdf_path = ?)", (pdf_path,))
+        return self._conn.execute("DELETE FROM checks WHERE pdf_path = ?", (pdf_path,)).rowcount
+
+    def start_job(self, pdf_path, fingerprint):
+        """
+        Marks `pdf_path` as running and returns the page to start from, or None
+        if the same file (same fingerprint) was already processed completely.
+        A changed fingerprint starts the file over from page 1, replacing the
+        rows stored from it before.
+        """
+        job = self.get_job(pdf_path)
+        if job is not None and job["fingerprint"] == fingerprint:
+            if job["status"] == "done":
+                return None
+            pages_done = job["pages_done"]
+        else:
+            pages_done = 0
+        with self._lock, self._conn:
+            if job is not None and job["fingerprint"] != fingerprint:
+                deleted = self._delete_rows_of(pdf_path)
+                if deleted:
+                    print(f"{pdf_path} changed; replacing its {deleted} stored rows.")
+            self._conn.execute("INSERT OR REPLACE INTO jobs (pdf_path, fingerprint, status, pages_done, error, updated) "
+                               "VALUES (?, ?, 'running', ?, '', ?)", (pdf_path, fingerprint, pages_done, time.time()))
+        return pages_done + 1
+
+    def add_page(self, pdf_path, record):
+        """Inserts one page's record and checkpoints its job in a single transaction. Returns the row id."""
+        with self._lock, self._conn:
+            row_id = self._insert(dict(record, pdf_path=pdf_path))
+            self._conn.execute("UPDATE jobs SET pages_done = ?, updated = ? WHERE pdf_path = ?",
+                               (int(record["page_num"]), time.time(), pdf_path))
+        return row_id
+
+    def finish_job(self, pdf_path, error=None):
+        """Marks a job done, or failed with `error`; a failed job resumes on its next start."""
+        with self._lock, self._conn:
+            self._conn.execute("UPDATE jobs SET status = ?, error = ?, updated = ? WHERE pdf_path = ?",
+                               ("failed" if error else "done", str(error or ""), time.time(), pdf_path))
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def open_store(path=DEFAULT_DB_PATH, legacy_csv_path=None):
+    """
+    Opens the store at `path`, indexing it for duplicates if it is from
+    before the index. If `legacy_csv_path` exists and was not imported yet
+    (see CheckStore.needs_import), it is imported first.
+    """
+    store = CheckStore(path)
+    if not store.duplicate_index_ready():
+        print(f"Indexing {path} for duplicate checks...")
+        store.rebuild_duplicate_index()
+    if legacy_csv_path and store.needs_import(legacy_csv_path):
+        imported = store.import_csv(legacy_csv_path)
+        print(f"Imported {imported} rows from {legacy_csv_path}")
+    return store
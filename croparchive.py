@@ -0,0 +1,170 @@
+import hashlib
+import io
+import os
+import queue
+import threading
+import time
+import zipfile
+from collections import OrderedDict
+
+from PIL import Image
+
+
+# Where the pipeline writes crop archives and the GUI reads them from
+DEFAULT_CROPS_DIR = "crops"
+
+
+def crop_name(pdf_path):
+    """
+    Name of the crop archive of the PDF at `pdf_path`: its file name plus a
+    hash of its absolute path, so PDFs of the same name from different
+    folders never share (or write to) one archive.
+    """
+    path = os.path.normcase(os.path.abspath(pdf_path))
+    return f"{os.path.basename(pdf_path)}-{hashlib.sha1(path.encode('utf-8')).hexdigest()[:12]}"
+
+
+def archive_path(pdf_name, directory="."):
+    """Archive holding every crop of `pdf_name` (a crop_name(), or a PDF's file name for older archives)."""
+    return os.path.join(directory, f"{pdf_name}.crops.zip")
+
+
+def member_name(page_num, region):
+    return f"{page_num}_{region}.png"
+
+
+class CropArchiveWriter:
+    """
+    Saves the crops of one PDF into a single zip archive from a background
+    thread, so PNG encoding stays out of the OCR loop. The zip's central
+    directory is the index: each crop is a '<page>_<region>.png' member.
+    The archive is written next to its final name and moved into place by
+    close(), so readers never see a half-written file. When a run resumes at
+    `start_page`, the crops of earlier pages are carried over from the
+    existing archive. Encoding time is reported to `stats` as "png_save".
+    """
+
+    def __init__(self, pdf_name, directory=".", max_pending=32, start_page=1, stats=None):
+        os.makedirs(directory, exist_ok=True)
+        self.path = archive_path(pdf_name, directory)
+        self._partial_path = self.path + ".part"
+        self.start_page = start_page
+        self.stats = stats
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._error = None
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def add(self, page_num, region, image):
+        """Queues a crop (numpy array or PIL image). Blocks if the writer falls behind."""
+        self._queue.put((member_name(page_num, region), image))
+
+    def _run(self):
+        try:
+            # PNG data is already compressed, so members are stored as-is
+            with zipfile.ZipFile(self._partial_path, "w", zipfile.ZIP_STORED) as archive:
+                self._copy_earlier_pages(archive)
+                while True:
+                    item = self._queue.get()
+                    if item is None:
+                        break
+                    name, image = item
+                    started = time.perf_counter()
+                    if not isinstance(image, Image.Image):
+                        image = Image.fromarray(image)
+                    buffer = io.BytesIO()
+                    image.save(buffer, format="PNG", compress_level=1)
+                    archive.writestr(name, buffer.getvalue())
+                    if self.stats is not None:
+                        self.stats.add_time("png_save", time.perf_counter() - started)
+        except Exception as e:
+            self._error = e
+            # keep draining so producers never block on a dead writer
+            while self._queue.get() is not None:
+                pass
+
+    def _copy_earlier_pages(self, archive):
+        if self.start_page <= 1 or not os.path.exists(self.path):
+            return
+        with zipfile.ZipFile(self.path) as previous:
+            for info in previous.infolist():
+                if int(info.filename.split("_", 1)[0]) < self.start_page:
+                    archive.writestr(info, previous.read(info))
+
+    def close(self):
+        """Waits for queued crops to be written and publishes the archive."""
+        self._queue.put(None)
+        self._thread.join()
+        if self._error is not None:
+            print(f"Failed to save crops to {self.path}: {self._error}")
+            return
+        os.replace(self._partial_path, self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class CropStore:
+    """
+    Reads crops back for display.
+    preview() returns a downscaled copy and keeps the last `max_previews` of
+    them in memory, so clicking through cards does not decode PNGs again.
+    full() decodes the original resolution on demand. Crops saved as loose
+    '<pdf>_<page>_<region>.png' files by older versions are still found.
+    """
+
+    def __init__(self, directory=".", max_previews=256, preview_size=(1160, 360)):
+        self.directory = directory
+        self.max_previews = max_previews
+        self.preview_size = preview_size
+        self._previews = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _archive_mtime(self, pdf_name):
+        try:
+            return os.path.getmtime(archive_path(pdf_name, self.directory))
+        except OSError:
+            return None
+
+    def _read(self, pdf_name, page_num, region):
+        """Returns (version, PIL image) of a crop, or (None, None) if it was not saved."""
+        # The archive is opened per read rather than kept open, so a new run
+        # of the same PDF can always replace it
+        path = archive_path(pdf_name, self.directory)
+        mtime = self._archive_mtime(pdf_name)
+        if mtime is not None:
+            with zipfile.ZipFile(path) as archive:
+                try:
+                    data = archive.read(member_name(page_num, region))
+                    return mtime, Image.open(io.BytesIO(data))
+                except KeyError:
+                    pass
+        legacy_path = os.path.join(self.directory, f"{pdf_name}_{page_num}_{region}.png")
+        if os.path.exists(legacy_path):
+            return os.path.getmtime(legacy_path), Image.open(legacy_path)
+        return None, None
+
+    def full(self, pdf_name, page_num, region):
+        with self._lock:
+            return self._read(pdf_name, page_num, region)[1]
+
+    def preview(self, pdf_name, page_num, region):
+        key = (pdf_name, page_num, region)
+        with self._lock:
+            cached = self._previews.get(key)
+            if cached is not None:
+                mtime = self._archive_mtime(pdf_name)
+                if mtime is None or mtime == cached[0]:
+                    self._previews.move_to_end(key)
+                    return cached[1]
+            version, image = self._read(pdf_name, page_num, region)
+            if image is None:
+                return None
+            image.thumbnail(self.preview_size, reducing_gap=2.0)
+            self._previews[key] = (version, image)
+            if len(self._previews) > self.max_previews:
+                self._previews.popitem(last=False)
+            return image
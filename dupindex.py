@@ -0,0 +1,56 @@
+"""
+Keys that identify a check for duplicate detection: its serial number plus
+the current account it is drawn on.
+- exact_key() compares the digits only, so '340-0000012345678-12' and
+  '340000001234567812' are the same account.
+- fuzzy_key() also reads letters OCR returns in place of digits ('O' for
+  '0', 'l' for '1', 'S' for '5', ...) as those digits. Digits are never
+  folded into each other: checks of one checkbook share the account and
+  have consecutive serials, so '...605' and '...606' must stay different.
+"""
+import re
+
+
+KEY_FIELDS = ("serijski_broj", "broj_tekuceg_racuna")
+
+# Letters OCR returns instead of digits
+LETTER_DIGITS = str.maketrans("OoQDIl|iL!ZzSsBGbgqT", "00001111112255866997")
+
+_NON_DIGITS = re.compile(r"\D+")
+
+
+def _digits(value):
+    return _NON_DIGITS.sub("", str(value or ""))
+
+
+def exact_key(record):
+    """'serial|account' digits of a record, or None if either is missing."""
+    serial, account = (_digits(record.get(field)) for field in KEY_FIELDS)
+    if not serial or not account:
+        return None
+    return f"{serial}|{account}"
+
+
+def fuzzy_key(record):
+    """Like exact_key(), after reading look-alike letters as the digits they stand for."""
+    serial, account = (_digits(str(record.get(field) or "").translate(LETTER_DIGITS)) for field in KEY_FIELDS)
+    if not serial or not account:
+        return None
+    return f"{serial}|{account}"
+
+
+def duplicate_keys(record):
+    """[(kind, key)] to index a record under: 'exact' first, then 'fuzzy'."""
+    keys = []
+    exact = exact_key(record)
+    if exact is not None:
+        keys.append(("exact", exact))
+    fuzzy = fuzzy_key(record)
+    if fuzzy is not None:
+        keys.append(("fuzzy", fuzzy))
+    return keys
+
+
+def describe(match):
+    """Human-readable flag for a match dict from CheckStore.find_duplicates()."""
+    return f"{match['match']} duplicate of {match['pdf_name'] or '?'} page {match['page_num']}"
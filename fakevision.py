@@ -0,0 +1,100 @@
+"""
+A local stand-in for the Google Vision images:annotate REST endpoint, for
+testing and benchmarking visionbackend.HttpVisionTransport without network
+access or credentials.
+
+    python fakevision.py --port 8088 --latency 0.2
+    parsepdf.PipelineSettings(vision_endpoint="http://127.0.0.1:8088")
+"""
+import argparse
+import base64
+import hashlib
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def default_responder(content):
+    """Text returned for an image: stable per image so runs are reproducible."""
+    return f"FAKE {hashlib.sha1(content).hexdigest()[:12]}\n"
+
+
+class FakeVisionServer(ThreadingHTTPServer):
+    """
+    - latency: seconds each request takes, to mimic the round trip.
+    - quota_every: answer every Nth request with HTTP 429 (0 = never).
+    - responder(png_bytes) -> text decides what each image "contains".
+    """
+
+    daemon_threads = True
+
+    def __init__(self, address, latency=0.0, quota_every=0, responder=default_responder):
+        super().__init__(address, _Handler)
+        self.latency = latency
+        self.quota_every = quota_every
+        self.responder = responder
+        self.requests_served = 0
+        self.images_served = 0
+        self._lock = threading.Lock()
+
+    @property
+    def endpoint(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+class _Handler(BaseHTTPRequestHandler):
+
+    def do_POST(self):
+        server = self.server
+        if not self.path.startswith("/v1/images:annotate"):
+            self.send_error(404)
+            return
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+
+        with server._lock:
+            server.requests_served += 1
+            throttled = server.quota_every and server.requests_served % server.quota_every == 0
+        if throttled:
+            self.send_error(429, "Quota exceeded")
+            return
+        if server.latency:
+            time.sleep(server.latency)
+
+        responses = []
+        for request in body.get("requests", []):
+            text = server.responder(base64.b64decode(request["image"]["content"]))
+            responses.append({"fullTextAnnotation": {"text": text},
+                              "textAnnotations": [{"description": text}]})
+        with server._lock:
+            server.images_served += len(responses)
+
+        payload = json.dumps({"responses": responses}).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(port=0, latency=0.0, quota_every=0, responder=default_responder):
+    """Starts a server on a background thread and returns it; call shutdown() when done."""
+    server = FakeVisionServer(("127.0.0.1", port), latency, quota_every, responder)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Local fake of the Google Vision images:annotate API")
+    parser.add_argument("--port", type=int, default=8088)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--quota-every", type=int, default=0)
+    args = parser.parse_args()
+
+    server = FakeVisionServer(("127.0.0.1", args.port), args.latency, args.quota_every)
+    print(f"Fake Vision API listening on {server.endpoint}")
+    server.serve_forever()
@@ -1,19 +1,48 @@
+import time
+
+STARTED = time.perf_counter()
+
 import customtkinter as ctk
 from tkinter import filedialog, Menu
 import threading
-import pandas as pd
 import os
-import time
-from PIL import Image
+import sys
+
+from cardlist import VirtualCardList
+from checkstore import CheckStore
+from dupindex import KEY_FIELDS
+from croparchive import DEFAULT_CROPS_DIR, CropStore, crop_name
+from pipelinestats import PipelineStats
+
+# Modules that must not be loaded before the window is up; see --time-to-window
+HEAVY_MODULES = ("torch", "easyocr", "cv2", "google.cloud.vision", "pdf2image")
+
+parsepdf = None
+_parsepdf_lock = threading.Lock()
+
+
+def load_parsepdf():
+    """
+    Imports the OCR pipeline on first use. The GUI calls this from background
+    threads only, so the window never waits for it.
+    """
+    global parsepdf
+    with _parsepdf_lock:
+        if parsepdf is None:
+            parsepdf = _import_parsepdf()
+        return parsepdf
+
 
 # --- Your actual OCR logic should be in a file named parsepdf.py ---
-try:
-    import parsepdf
-except ImportError:
-    print("Warning: 'parsepdf.py' not found. Using dummy data function.")
+def _import_parsepdf():
+    try:
+        import parsepdf
+        return parsepdf
+    except ImportError:
+        print("Warning: 'parsepdf.py' not found. Using dummy data function.")
 
 
-    def parse_from_pdf(pdf_path, use_google=False):
+    def parse_from_pdf(pdf_path, use_google=False, engine=None, stats=None, find_duplicates=None):
         print(f"Simulating OCR processing for: {pdf_path}...")
         time.sleep(3)
         return [
@@ -28,8 +57,9 @@ except ImportError:
         pass
 
 
-    parsepdf = DummyModule()
-    parsepdf.parse_from_pdf = parse_from_pdf
+    module = DummyModule()
+    module.parse_from_pdf = parse_from_pdf
+    return module
 
 
 # --------------------------------------------------------------------
@@ -48,9 +78,17 @@ class CheckProcessorApp(ctk.CTk):
         self.grid_rowconfigure(0, weight=1)
 
         # --- Class Attributes ---
-        self.data_df = pd.DataFrame()  # Holds all data
+        self.store = None  # Holds all data, see checkstore.py
         self.selected_pdf_path = ""
         self.csv_file_path = 'results.csv'
+        self.db_file_path = 'results.db'
+        self.crop_store = CropStore(DEFAULT_CROPS_DIR)
+        # Archives written before they were kept per source, in the working directory
+        self.legacy_crop_store = CropStore()
+        self.ocr_engine = None
+        self._warm_up_thread = None
+        self.first_window_seconds = None
+        self.heavy_modules_at_first_window = None
 
         # --- Sidebar ---
         self.sidebar_frame = ctk.CTkFrame(self, width=200, corner_radius=0)
@@ -72,141 +110,151 @@ class CheckProcessorApp(ctk.CTk):
         self.process_with_google_button.grid(row=3, column=0, padx=20, pady=10)
         self.status_label = ctk.CTkLabel(self.sidebar_frame, text="Status: Ready", anchor="w")
         self.status_label.grid(row=4, column=0, padx=20, pady=(20, 0))
-        self.progressbar = ctk.CTkProgressBar(self.sidebar_frame, mode="indeterminate")
+        self.progressbar = ctk.CTkProgressBar(self.sidebar_frame, mode="determinate")
+        self.export_csv_button = ctk.CTkButton(self.sidebar_frame, text="Export CSV", command=self.export_csv_event)
+        self.export_csv_button.grid(row=6, column=0, padx=20, pady=(10, 20))
 
         # --- Main Content Area ---
         self.create_data_display()
-        self.load_data_from_csv()
+        self.load_data()
+        # Tk maps the window in an idle callback; this one runs right after it
+        self.after_idle(self.on_window_shown)
+
+    def on_window_shown(self):
+        """Records the time to first window, then starts the slow startup work in the background."""
+        self.update_idletasks()
+        self.first_window_seconds = time.perf_counter() - STARTED
+        self.heavy_modules_at_first_window = [name for name in HEAVY_MODULES if name in sys.modules]
+        self.update_store_in_background()
+        self.warm_up_ocr_engine()
+
+    def warm_up_ocr_engine(self):
+        """Imports the OCR pipeline and loads the shared EasyOCR models on a background thread, once."""
+        if self._warm_up_thread is None:
+            self._warm_up_thread = threading.Thread(target=self._warm_up, daemon=True)
+            self._warm_up_thread.start()
+
+    def _warm_up(self):
+        module = load_parsepdf()
+        if not hasattr(module, "get_engine"):
+            return
+        self.ocr_engine = module.get_engine()
+        try:
+            self.ocr_engine.warm_up()
+        except Exception as e:
+            print(f"Could not preload the OCR models: {e}")
 
     def create_data_display(self):
-        """Creates the main scrollable frame for displaying data cards."""
-        self.scrollable_frame = ctk.CTkScrollableFrame(self, label_text="Extracted Data")
-        self.scrollable_frame.grid(row=0, column=1, padx=20, pady=20, sticky="nsew")
-        self.scrollable_frame.grid_columnconfigure(0, weight=1)
+        """Creates the virtualized list that displays the data cards."""
+        self.card_list = VirtualCardList(self, row_count=lambda: self.store.count() if self.store else 0,
+                                         fetch_rows=lambda offset, limit: self.store.fetch(offset, limit),
+                                         on_edit=self.on_entry_update, on_show_image=self.show_crop,
+                                         label_text="Extracted Data")
+        self.card_list.grid(row=0, column=1, padx=20, pady=20, sticky="nsew")
 
     def populate_data_display(self):
-        """Clears and populates the scrollable frame with data cards from self.data_df."""
-        for widget in self.scrollable_frame.winfo_children():
-            widget.destroy()
-        for index, row in self.data_df.iterrows():
-            self.create_data_card(row, index)
-
-    def create_data_card(self, data_row, index):
-        """Creates a single 'card' for one row of data with a more readable layout."""
-        card_frame = ctk.CTkFrame(self.scrollable_frame, border_width=2)
-        card_frame.grid(sticky="ew", padx=10, pady=(5, 15))
-        card_frame.grid_columnconfigure(0, weight=1)
-
-        # --- Card Header ---
-        pdf_name = data_row.get("pdf_name", "N/A")
-        page_num = data_row.get("page_num", 0)
-        header_text = f"Source: {pdf_name}  |  Page: {page_num}"
-        header_label = ctk.CTkLabel(card_frame, text=header_text, font=ctk.CTkFont(size=16, weight="bold"), anchor="w")
-        header_label.grid(row=0, column=0, padx=15, pady=(10, 5), sticky="ew")
-
-        # --- Main content frame with 2 columns ---
-        content_frame = ctk.CTkFrame(card_frame, fg_color="transparent")
-        content_frame.grid(row=1, column=0, padx=5, pady=5, sticky="ew")
-        content_frame.grid_columnconfigure((0, 1), weight=1)
-
-        # --- Left Column: OCR Data ---
-        ocr_frame = ctk.CTkFrame(content_frame)
-        ocr_frame.grid(row=0, column=0, padx=10, pady=5, sticky="nsew")
-        ocr_frame.grid_columnconfigure(0, weight=1)
-        ctk.CTkLabel(ocr_frame, text="OCR Data", font=ctk.CTkFont(weight="bold")).pack(pady=(5, 10))
-
-        self.create_entry_field(ocr_frame, "Bank Name:", data_row.get("bank_name", ""), index, "bank_name").pack(
-            fill="x", expand=True, padx=10, pady=5)
-        self.create_entry_field(ocr_frame, "Platite Račun Br:", data_row.get("platite_racun_br", ""), index,
-                                "platite_racun_br").pack(fill="x", expand=True, padx=10, pady=5)
-        self.create_entry_field(ocr_frame, "Broj Tekućeg Računa:", data_row.get("broj_tekuceg_racuna", ""), index,
-                                "broj_tekuceg_racuna").pack(fill="x", expand=True, padx=10, pady=5)
-        self.create_entry_field(ocr_frame, "Serijski Broj:", data_row.get("serijski_broj", ""), index,
-                                "serijski_broj").pack(fill="x", expand=True, padx=10, pady=5)
-
-        # --- Right Column: Manual Input & Verification ---
-        right_column_frame = ctk.CTkFrame(content_frame, fg_color="transparent")
-        right_column_frame.grid(row=0, column=1, padx=10, pady=5, sticky="nsew")
-        right_column_frame.grid_columnconfigure(0, weight=1)
-
-        manual_frame = ctk.CTkFrame(right_column_frame)
-        manual_frame.grid(row=0, column=0, sticky="nsew")
-        manual_frame.grid_columnconfigure(0, weight=1)
-        ctk.CTkLabel(manual_frame, text="Manual Input", font=ctk.CTkFont(weight="bold")).pack(pady=(5, 10))
-
-        self.create_entry_field(manual_frame, "Datum Dospeća:", data_row.get("datum_dospeca", ""), index,
-                                "datum_dospeca").pack(fill="x", expand=True, padx=10, pady=5)
-        self.create_entry_field(manual_frame, "Iznos:", data_row.get("iznos", ""), index, "iznos").pack(fill="x",
-                                                                                                        expand=True,
-                                                                                                        padx=10, pady=5)
-        self.create_entry_field(manual_frame, "Radna Jedinica:", data_row.get("radna_jedinica", ""), index,
-                                "radna_jedinica").pack(fill="x", expand=True, padx=10, pady=5)
-
-        # --- Image Buttons ---
-        image_frame = ctk.CTkFrame(right_column_frame)
-        image_frame.grid(row=1, column=0, sticky="nsew", pady=(10, 0))
-        image_frame.grid_columnconfigure((0, 1), weight=1)
-        ctk.CTkLabel(image_frame, text="Image Verification", font=ctk.CTkFont(weight="bold")).grid(row=0, column=0,
-                                                                                                   columnspan=2,
-                                                                                                   pady=(5, 10))
-
-        upper_img_path = f"{pdf_name}.pdf_{page_num}_upper.png"
-        lower_img_path = f"{pdf_name}.pdf_{page_num}_lower.png"
-        upper_button = ctk.CTkButton(image_frame, text="Show Upper Image",
-                                     command=lambda p=upper_img_path: self.show_image(p))
-        upper_button.grid(row=1, column=0, padx=5, pady=5, sticky="ew")
-        lower_button = ctk.CTkButton(image_frame, text="Show Lower Image",
-                                     command=lambda p=lower_img_path: self.show_image(p))
-        lower_button.grid(row=1, column=1, padx=5, pady=5, sticky="ew")
-
-    def create_entry_field(self, parent, title, value, index, col_name):
-        """Creates a self-contained, editable entry field that saves on focus out."""
-        # This frame isolates the label and entry from the parent's layout manager
-        field_frame = ctk.CTkFrame(parent, fg_color="transparent")
-
-        label = ctk.CTkLabel(field_frame, text=title, font=ctk.CTkFont(size=12))
-        label.pack(fill="x", padx=5, pady=(0, 2))
-
-        entry = ctk.CTkEntry(field_frame)
-        entry.pack(fill="x", expand=True, padx=5)
-        entry.insert(0, str(value))
-        entry.bind("<FocusOut>", lambda event, idx=index, name=col_name: self.on_entry_update(event, idx, name))
-
-        return field_frame
-
-    def on_entry_update(self, event, row_index, column_name):
-        """Updates the DataFrame and saves to CSV when an entry field loses focus."""
-        new_value = event.widget.get()
-        self.data_df.loc[row_index, column_name] = new_value
-        self.save_current_data_to_csv()
-        self.status_label.configure(text=f"Saved '{column_name}' for row {row_index}")
-
-    def show_image(self, image_path):
-        if not os.path.exists(image_path):
-            self.status_label.configure(text=f"Error: Image not found at {image_path}")
+        """Re-reads the cards in view from self.store."""
+        self.card_list.reload()
+
+    def on_entry_update(self, row_index, column_name, new_value):
+        """Saves a single field to the store when an entry field loses focus."""
+        if self.store.update_cell(row_index, column_name, new_value):
+            self.status_label.configure(text=f"Saved '{column_name}' for row {row_index}")
+            if column_name in KEY_FIELDS:
+                # The edit can create or resolve duplicates; refresh the flags in view
+                self.after_idle(self.card_list.reload)
+
+    def show_crop(self, row, region):
+        """Shows a cached, downscaled crop; the full resolution is loaded only on request."""
+        if row.get("pdf_path"):
+            crop_store, archive_name = self.crop_store, crop_name(row["pdf_path"])
+        else:
+            # Rows stored before pdf_file was recorded only have the shortened name
+            crop_store, archive_name = self.legacy_crop_store, row.get("pdf_file") or f"{row.get('pdf_name')}.pdf"
+        page_num = row.get("page_num", 0)
+        title = f"{row.get('pdf_file') or archive_name}_{page_num}_{region}"
+        try:
+            preview = crop_store.preview(archive_name, page_num, region)
+        except Exception as e:
+            self.status_label.configure(text=f"Error: Failed to load image: {e}")
+            return
+        if preview is None:
+            self.status_label.configure(text=f"Error: Image not found for {title}")
             return
         image_window = ctk.CTkToplevel(self)
-        image_window.title(os.path.basename(image_path))
+        image_window.title(title)
         image_window.geometry("1200x400")
         image_window.transient(self)
+        image_label = ctk.CTkLabel(image_window, image=ctk.CTkImage(preview, size=preview.size), text="")
+        image_label.pack(padx=20, pady=(20, 5), expand=True, fill="both")
+
+        def show_full_resolution():
+            try:
+                pil_image = crop_store.full(archive_name, page_num, region)
+                image_label.configure(image=ctk.CTkImage(pil_image, size=pil_image.size))
+                image_window.geometry(f"{pil_image.width + 40}x{pil_image.height + 80}")
+            except Exception as e:
+                image_label.configure(image=None, text=f"Failed to load image: {e}")
+
+        ctk.CTkButton(image_window, text="Full Resolution", command=show_full_resolution).pack(pady=(0, 10))
+
+    def load_data(self):
+        """Opens the results store. Only the cards in view are read, so this is quick at any size."""
         try:
-            pil_image = Image.open(image_path)
-            ctk_image = ctk.CTkImage(pil_image, size=pil_image.size)
-            image_label = ctk.CTkLabel(image_window, image=ctk_image, text="")
-            image_label.pack(padx=20, pady=20, expand=True, fill="both")
+            self.store = CheckStore(self.db_file_path)
+            self.populate_data_display()
         except Exception as e:
-            ctk.CTkLabel(image_window, text=f"Failed to load image: {e}").pack(padx=20, pady=20)
+            self.status_label.configure(text=f"Error loading data: {e}")
 
-    def load_data_from_csv(self):
-        if not os.path.exists(self.csv_file_path):
+    def update_store_in_background(self):
+        """
+        Does the slow store upkeep on a background thread:
+        - indexes a store from before duplicate detection, then refreshes the
+          cards' duplicate flags;
+        - imports an existing results.csv on first run, or finishes an import
+          that was cut short (e.g. by closing the window). Cards appear chunk
+          by chunk.
+        """
+        if self.store is None:
+            return
+        needs_index = not self.store.duplicate_index_ready()
+        needs_import = self.store.needs_import(self.csv_file_path)
+        if not needs_index and not needs_import:
             return
+
+        def run():
+            try:
+                if needs_index:
+                    self.store.rebuild_duplicate_index()
+                    self.after(0, self.card_list.reload)
+                    self.after(0, lambda: self.status_label.configure(
+                        text=f"Importing {self.csv_file_path}..." if needs_import else "Status: Ready"))
+                if needs_import:
+                    imported = self.store.import_csv(
+                        self.csv_file_path,
+                        on_rows=lambda n: self.after(0, self.card_list.rows_appended, False))
+                    self.after(0, lambda: self.status_label.configure(
+                        text=f"Imported {imported} rows from {self.csv_file_path}"))
+            except Exception as e:
+                # `e` is unbound once the except block ends, so format the message now
+                message = f"Error loading data: {e}"
+                self.after(0, lambda: self.status_label.configure(text=message))
+
+        if needs_index:
+            self.status_label.configure(text="Indexing checks for duplicates...")
+        else:
+            self.status_label.configure(text=f"Importing {self.csv_file_path}...")
+        threading.Thread(target=run, daemon=True).start()
+
+    def export_csv_event(self):
         try:
-            self.data_df = pd.read_csv(self.csv_file_path).fillna("")
-            self.populate_data_display()
+            self.store.export_csv(self.csv_file_path)
+            self.status_label.configure(text=f"Exported to {self.csv_file_path}")
         except Exception as e:
-            self.status_label.configure(text=f"Error loading CSV: {e}")
+            self.status_label.configure(text=f"Error exporting CSV: {e}")
 
     def select_pdf_event(self):
+        self.warm_up_ocr_engine()
         self.selected_pdf_path = filedialog.askopenfilename(title="Select a PDF file",
                                                             filetypes=(("PDF Files", "*.pdf"),))
         if self.selected_pdf_path:
@@ -225,8 +273,8 @@ class CheckProcessorApp(ctk.CTk):
         self.process_pdf_button.configure(state="disabled")
         self.process_with_google_button.configure(state="disabled")
         self.status_label.configure(text="Processing with Google..." if use_google else "Processing...")
+        self.progressbar.set(0)
         self.progressbar.grid(row=5, column=0, padx=20, pady=10, sticky="ew")
-        self.progressbar.start()
         thread = threading.Thread(target=self.run_processing_thread, args=(use_google,), daemon=True)
         thread.start()
 
@@ -235,51 +283,67 @@ class CheckProcessorApp(ctk.CTk):
         Runs the OCR and parsing logic by calling the main function from parsepdf.
         This ensures the correct parser is always used.
         """
+        # Progress events arrive on this worker thread; hand them to Tk's thread
+        stats = PipelineStats(listener=lambda event: self.after(0, self.show_progress, event))
         try:
-            extracted_data = parsepdf.parse_from_pdf(self.selected_pdf_path, use_google=use_google)
+            extracted_data = load_parsepdf().parse_from_pdf(self.selected_pdf_path, use_google=use_google,
+                                                            engine=self.ocr_engine, stats=stats,
+                                                            find_duplicates=self.store.duplicate_of)
             self.after(0, self.update_ui_with_results, extracted_data)
         except Exception as e:
             self.after(0, self.processing_error, e)
 
+    def show_progress(self, event):
+        """Moves the progress bar to the last finished page and shows the ETA."""
+        if not event.total_pages or event.kind == "finish":
+            return
+        self.progressbar.set(event.pages_done / event.total_pages)
+        text = f"Page {event.pages_done}/{event.total_pages}"
+        if event.eta is not None:
+            minutes, seconds = divmod(int(event.eta), 60)
+            text += f" - ETA {minutes}:{seconds:02d}"
+        self.status_label.configure(text=text)
+
     def update_ui_with_results(self, new_data):
-        pdf_name = os.path.basename(self.selected_pdf_path).split('.')[0]
+        pdf_file = os.path.basename(self.selected_pdf_path)
+        pdf_name = pdf_file.split('.')[0]
         for i, record in enumerate(new_data):
             record['pdf_name'] = pdf_name
+            record['pdf_file'] = pdf_file
+            record['pdf_path'] = os.path.abspath(self.selected_pdf_path)
             record['page_num'] = i + 1
-        new_df = pd.DataFrame(new_data)
-        self.data_df = pd.concat([self.data_df, new_df], ignore_index=True)
-        self.save_current_data_to_csv()
-        self.populate_data_display()
-        self.progressbar.stop()
+        self.store.insert_many(new_data)
+        self.card_list.rows_appended()
         self.progressbar.grid_forget()
-        self.status_label.configure(text="Status: Complete!")
+        duplicates = sum(1 for record in new_data if record.get('duplicate_of'))
+        if duplicates:
+            self.status_label.configure(text=f"Status: Complete! {duplicates} possible duplicates")
+        else:
+            self.status_label.configure(text="Status: Complete!")
         self.select_pdf_button.configure(state="normal")
         self.process_pdf_button.configure(state="disabled")
         self.process_with_google_button.configure(state="disabled")
 
     def processing_error(self, error):
-        self.progressbar.stop()
         self.progressbar.grid_forget()
         self.status_label.configure(text=f"Error: {error}")
         self.select_pdf_button.configure(state="normal")
         self.process_pdf_button.configure(state="disabled")
         self.process_with_google_button.configure(state="disabled")
 
-    def save_current_data_to_csv(self):
-        required_cols = [
-            "pdf_name", "page_num", "bank_name", "platite_racun_br",
-            "broj_tekuceg_racuna", "serijski_broj", "datum_dospeca",
-            "iznos", "radna_jedinica"
-        ]
-        for col in required_cols:
-            if col not in self.data_df.columns:
-                self.data_df[col] = ""
-        save_df = self.data_df[required_cols].fillna("")
-        save_df.to_csv(self.csv_file_path, index=False)
-        print(f"Data saved to {self.csv_file_path}")
+
+def report_time_to_window(app):
+    """For benchmark.py --startup: prints the startup measurements as JSON and closes."""
+    import json
+
+    print(json.dumps({"first_window_seconds": app.first_window_seconds,
+                      "heavy_modules": app.heavy_modules_at_first_window}), flush=True)
+    app.destroy()
 
 
 if __name__ == "__main__":
     os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = r"E:\DevTools\vision-key.json"
     app = CheckProcessorApp()
+    if "--time-to-window" in sys.argv:
+        app.after_idle(report_time_to_window, app)
     app.mainloop()
@@ -0,0 +1,206 @@
+import threading
+
+from checkrules import Token
+
+
+class OCRBackend:
+    """
+    What parsepdf.ocr_pages() needs from an OCR engine.
+    - name, version and settings_key() identify its results in the OCR cache.
+    - readtext_many(images, batch_size) returns, per image, a list of
+      (bbox, text, confidence) tokens; confidence is in [0, 1] or None.
+    - imap(jobs, batch_size) runs a stream of jobs in order. A job is a pair
+      (images, region names), so engines that care which part of the check
+      they are reading can override readtext_regions().
+    - counters() returns cumulative numbers (calls, seconds per step, ...)
+      for pipelinestats to report.
+    """
+
+    name = None
+    version = None
+
+    def settings_key(self):
+        return ""
+
+    def warm_up(self):
+        return self
+
+    def counters(self):
+        return {}
+
+    def readtext_many(self, images, batch_size=1):
+        raise NotImplementedError
+
+    def readtext_regions(self, images, regions, batch_size=1):
+        return self.readtext_many(images, batch_size)
+
+    def imap(self, jobs, batch_size=1):
+        for images, regions in jobs:
+            yield self.readtext_regions(images, regions, batch_size)
+
+
+class TesseractEngine(OCRBackend):
+    """
+    Tesseract through pytesseract. Cheap and CPU-friendly, but less accurate
+    than EasyOCR on noisy scans. Words are grouped into lines so its tokens
+    look like EasyOCR's.
+    """
+
+    name = "tesseract"
+
+    def __init__(self, lang="srp_latn+eng", config="--psm 6"):
+        import pytesseract
+
+        self._pytesseract = pytesseract
+        self.lang = lang
+        self.config = config
+        self._version = None
+
+    @property
+    def version(self):
+        if self._version is None:
+            self._version = str(self._pytesseract.get_tesseract_version())
+        return self._version
+
+    def settings_key(self):
+        return f"{self.lang}|{self.config}"
+
+    def readtext(self, image):
+        data = self._pytesseract.image_to_data(image, lang=self.lang, config=self.config,
+                                               output_type=self._pytesseract.Output.DICT)
+        lines = {}
+        for i, word in enumerate(data["text"]):
+            confidence = float(data["conf"][i])
+            if not word.strip() or confidence < 0:
+                continue
+            key = (data["block_num"][i], data["par_num"][i], data["line_num"][i])
+            left, top = data["left"][i], data["top"][i]
+            right, bottom = left + data["width"][i], top + data["height"][i]
+            line = lines.setdefault(key, {"words": [], "confs": [], "box": [left, top, right, bottom]})
+            line["words"].append(word)
+            line["confs"].append(confidence / 100)
+            box = line["box"]
+            line["box"] = [min(box[0], left), min(box[1], top), max(box[2], right), max(box[3], bottom)]
+
+        tokens = []
+        for line in lines.values():
+            left, top, right, bottom = line["box"]
+            bbox = [[left, top], [right, top], [right, bottom], [left, bottom]]
+            tokens.append((bbox, " ".join(line["words"]), sum(line["confs"]) / len(line["confs"])))
+        return tokens
+
+    def readtext_many(self, images, batch_size=1):
+        return [self.readtext(image) for image in images]
+
+
+# Fields that must come out of each region for its crop to count as read
+REQUIRED_FIELDS = {
+    "upper": ("bank_name", "platite_racun_br"),
+    "lower": ("broj_tekuceg_racuna", "serijski_broj"),
+}
+
+
+class CascadeEngine(OCRBackend):
+    """
+    Runs cheap engines first and escalates only the crops they could not read.
+    A crop is parsed from its tokens above `min_confidence`, as the pipeline
+    parses it, and goes to the next tier when that leaves one of its region's
+    REQUIRED_FIELDS empty or reads one below `threshold` confidence. Noise and
+    text outside the required fields don't count. Crops of no known region
+    escalate when a kept token is below `threshold`, and crops with no kept
+    tokens always escalate. `rules` is a checkrules.CheckRules.
+    report() tells how many crops each tier handled (its results were kept),
+    how many each tier passed on, and why crops escalated.
+    """
+
+    def __init__(self, tiers, rules, threshold=0.6, min_confidence=0.2):
+        self.tiers = list(tiers)
+        self.rules = rules
+        self.threshold = threshold
+        self.min_confidence = min_confidence
+        self._lock = threading.Lock()
+        self.handled = {tier.name: 0 for tier in self.tiers}
+        self.escalated_from = {tier.name: 0 for tier in self.tiers[:-1]}
+        self.escalated = {"low_confidence": 0, "missing_fields": 0}
+
+    @property
+    def name(self):
+        return "cascade(" + ">".join(tier.name for tier in self.tiers) + ")"
+
+    @property
+    def version(self):
+        return "+".join(str(tier.version) for tier in self.tiers)
+
+    def settings_key(self):
+        return "|".join([tier.settings_key() for tier in self.tiers] + [str(self.threshold)])
+
+    def warm_up(self):
+        for tier in self.tiers:
+            tier.warm_up()
+        return self
+
+    def escalation_reason(self, tokens, region):
+        """Why a crop's tokens are not good enough, or None if they are."""
+        kept = [Token(text, prob, bbox) for bbox, text, prob in tokens
+                if prob is None or prob > self.min_confidence]
+        if not kept:
+            return "low_confidence"
+        required = REQUIRED_FIELDS.get(region)
+        if not required:
+            confidences = [token.confidence for token in kept if token.confidence is not None]
+            return "low_confidence" if confidences and min(confidences) < self.threshold else None
+        upper, lower = (kept, []) if region == "upper" else ([], kept)
+        info, confidence = self.rules.parse_tokens(upper, lower)
+        if any(info[field] is None for field in required):
+            return "missing_fields"
+        if any(confidence[field] is not None and confidence[field] < self.threshold for field in required):
+            return "low_confidence"
+        return None
+
+    def counters(self):
+        counters = {}
+        report = self.report()
+        for tier, handled in report["handled"].items():
+            counters[f"handled.{tier}"] = handled
+        for tier, escalated in report["escalated_from"].items():
+            counters[f"escalated_from.{tier}"] = escalated
+        for reason, escalated in report["escalated"].items():
+            counters[f"escalated.{reason}"] = escalated
+        for tier in self.tiers:
+            for key, value in tier.counters().items():
+                counters[f"{tier.name}.{key}"] = value
+        return counters
+
+    def readtext_many(self, images, batch_size=1):
+        return self.readtext_regions(images, [None] * len(images), batch_size)
+
+    def readtext_regions(self, images, regions, batch_size=1):
+        results = [None] * len(images)
+        todo = list(range(len(images)))
+        for level, tier in enumerate(self.tiers):
+            if not todo:
+                break
+            tier_results = tier.readtext_many([images[i] for i in todo], batch_size)
+            last_tier = level == len(self.tiers) - 1
+            next_todo = []
+            reasons = []
+            for i, tokens in zip(todo, tier_results):
+                results[i] = tokens
+                reason = None if last_tier else self.escalation_reason(tokens, regions[i])
+                if reason is None:
+                    continue
+                next_todo.append(i)
+                reasons.append(reason)
+            with self._lock:
+                self.handled[tier.name] += len(todo) - len(next_todo)
+                if next_todo:
+                    self.escalated_from[tier.name] += len(next_todo)
+                for reason in reasons:
+                    self.escalated[reason] += 1
+            todo = next_todo
+        return results
+
+    def report(self):
+        with self._lock:
+            return {"handled": dict(self.handled), "escalated_from": dict(self.escalated_from),
+                    "escalated": dict(self.escalated)}
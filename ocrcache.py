@@ -0,0 +1,134 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+
+DEFAULT_CACHE_PATH = 'ocr_cache.sqlite'
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+
+def _plain(value):
+    """Converts numpy scalars/arrays inside OCR results into JSON-friendly values."""
+    if isinstance(value, (list, tuple)):
+        return [_plain(item) for item in value]
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def make_key(image, region, backend, version, settings=""):
+    """
+    Content address of one crop: a hash of its pixels plus everything that can
+    change what the OCR backend returns for it.
+    """
+    image = np.ascontiguousarray(image)
+    digest = hashlib.blake2b(digest_size=20)
+    digest.update(f"{backend}|{version}|{settings}|{region}|{image.shape}|{image.dtype}|".encode())
+    digest.update(memoryview(image).cast("B"))
+    return digest.hexdigest()
+
+
+class OCRCache:
+    """
+    On-disk cache of raw OCR tokens, one entry per crop.
+    Entries are stored in SQLite together with the backend name and version
+    they came from. When the total size goes over `max_bytes` the least
+    recently used entries are evicted. hits/misses count lookups since the
+    cache was opened.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_bytes=DEFAULT_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                backend TEXT NOT NULL,
+                version TEXT NOT NULL,
+                tokens TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                last_used REAL NOT NULL
+            )""")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS entries_last_used ON entries (last_used)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS entries_backend ON entries (backend, version)")
+        self._total_bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+
+    def get(self, key):
+        """Returns the cached tokens for `key`, or None on a miss."""
+        with self._lock:
+            row = self._conn.execute("SELECT tokens FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._conn.execute("UPDATE entries SET last_used = ? WHERE key = ?", (time.time(), key))
+        return json.loads(row[0])
+
+    def put(self, key, backend, version, tokens):
+        payload = json.dumps(_plain(tokens), ensure_ascii=False)
+        size = len(payload.encode("utf-8"))
+        with self._lock:
+            old = self._conn.execute("SELECT size FROM entries WHERE key = ?", (key,)).fetchone()
+            self._conn.execute("INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?)",
+                               (key, backend, str(version), payload, size, time.time()))
+            self._total_bytes += size - (old[0] if old else 0)
+            self._evict()
+
+    def _evict(self):
+        if self._total_bytes <= self.max_bytes:
+            return
+        evicted = []
+        for key, size in self._conn.execute("SELECT key, size FROM entries ORDER BY last_used"):
+            evicted.append((key,))
+            self._total_bytes -= size
+            if self._total_bytes <= self.max_bytes:
+                break
+        self._conn.executemany("DELETE FROM entries WHERE key = ?", evicted)
+
+    def invalidate(self, backend, keep_version=None):
+        """
+        Drops the entries of `backend`. With keep_version, only entries written by
+        other versions of the backend are dropped.
+        """
+        with self._lock:
+            if keep_version is None:
+                self._conn.execute("DELETE FROM entries WHERE backend = ?", (backend,))
+            else:
+                self._conn.execute("DELETE FROM entries WHERE backend = ? AND version != ?",
+                                   (backend, str(keep_version)))
+            self._total_bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+
+    def stats(self):
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+            return {"hits": self.hits, "misses": self.misses, "entries": entries, "bytes": self._total_bytes}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_cache(path=DEFAULT_CACHE_PATH, max_bytes=DEFAULT_MAX_BYTES):
+    """Returns the shared cache for `path`, opening it on first use."""
+    with _caches_lock:
+        cache = _caches.get(path)
+        if cache is None:
+            cache = _caches[path] = OCRCache(path, max_bytes)
+        cache.max_bytes = max_bytes
+        return cache
@@ -0,0 +1,207 @@
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from importlib import metadata
+
+from ocrbackend import OCRBackend
+
+
+LANGUAGES = ['rs_latin', 'en']
+
+
+class EasyOCREngine(OCRBackend):
+    """
+    Long-lived wrapper around easyocr.Reader.
+    The detection and recognition models are loaded from disk once, on first use
+    or on an explicit warm_up(), and then shared by every caller. Inference is
+    serialized with a lock because a single Reader is not safe to run from
+    several threads at the same time. counters() adds up the time spent in
+    text detection and in recognition.
+    easyocr (and with it torch and OpenCV) is only imported when the models
+    are loaded, so creating an engine or computing cache keys stays cheap.
+    """
+
+    name = "easyocr"
+
+    def __init__(self, languages=None):
+        self.languages = languages or LANGUAGES
+        self._reader = None
+        self._load_lock = threading.Lock()
+        self._run_lock = threading.Lock()
+        self._counters = {"images": 0, "load_seconds": 0.0, "detect_seconds": 0.0,
+                          "recognize_seconds": 0.0, "batched_seconds": 0.0}
+
+    @property
+    def version(self):
+        try:
+            return metadata.version("easyocr")
+        except metadata.PackageNotFoundError:
+            import easyocr
+            return easyocr.__version__
+
+    def settings_key(self):
+        """Everything besides the pixels that changes what this engine returns."""
+        return ",".join(self.languages)
+
+    @property
+    def is_loaded(self):
+        return self._reader is not None
+
+    @property
+    def reader(self):
+        if self._reader is None:
+            with self._load_lock:
+                if self._reader is None:
+                    print("Loading EasyOCR models...")
+                    started = time.perf_counter()
+                    import easyocr
+                    self._reader = easyocr.Reader(self.languages)
+                    self._counters["load_seconds"] += time.perf_counter() - started
+        return self._reader
+
+    def warm_up(self):
+        """Loads the models now instead of on the first page."""
+        self.reader
+        return self
+
+    def counters(self):
+        with self._run_lock:
+            return dict(self._counters)
+
+    def readtext(self, image):
+        # Reader.readtext() is detect() followed by recognize(); they are
+        # called separately here so each step can be timed.
+        from easyocr.utils import reformat_input
+
+        reader = self.reader
+        with self._run_lock:
+            started = time.perf_counter()
+            img, img_cv_grey = reformat_input(image)
+            horizontal_list, free_list = reader.detect(img, reformat=False)
+            detected = time.perf_counter()
+            result = reader.recognize(img_cv_grey, horizontal_list[0], free_list[0], reformat=False)
+            self._counters["images"] += 1
+            self._counters["detect_seconds"] += detected - started
+            self._counters["recognize_seconds"] += time.perf_counter() - detected
+            return result
+
+    def readtext_many(self, images, batch_size=1):
+        """
+        OCRs a list of images and returns one result list per image, in order.
+        With batch_size > 1 the images go through EasyOCR's batched API, which
+        needs equally sized inputs, so they are grouped by shape first and each
+        group is run `batch_size` images at a time.
+        """
+        if batch_size <= 1:
+            return [self.readtext(image) for image in images]
+
+        groups = {}
+        for index, image in enumerate(images):
+            groups.setdefault(image.shape, []).append(index)
+
+        results = [None] * len(images)
+        reader = self.reader
+        with self._run_lock:
+            started = time.perf_counter()
+            for indexes in groups.values():
+                for start in range(0, len(indexes), batch_size):
+                    chunk = indexes[start:start + batch_size]
+                    batch = reader.readtext_batched([images[i] for i in chunk], batch_size=batch_size)
+                    for i, result in zip(chunk, batch):
+                        results[i] = result
+            self._counters["images"] += len(images)
+            self._counters["batched_seconds"] += time.perf_counter() - started
+        return results
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_engine():
+    """Returns the process-wide engine, creating it (but not loading it) on first call."""
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = EasyOCREngine()
+        return _engine
+
+
+# --- Multi-process OCR ---
+# Each pool worker owns its own warm engine. Workers are created once per
+# (workers, torch_threads) combination and reused across PDFs.
+
+_worker_engine = None
+
+
+def _init_worker(torch_threads):
+    global _worker_engine
+    if torch_threads:
+        import torch
+        torch.set_num_threads(torch_threads)
+    _worker_engine = EasyOCREngine().warm_up()
+
+
+def _readtext_in_worker(images, batch_size):
+    return _worker_engine.readtext_many(images, batch_size)
+
+
+class OCRProcessPool:
+    """
+    A process pool of EasyOCR workers.
+    imap() takes an iterable of (images, region names) jobs as they become
+    available and yields the OCR results in the same order the jobs came in.
+    At most `max_in_flight` jobs are queued at once, so a slow pool never makes
+    the producer buffer the whole document.
+    """
+
+    def __init__(self, workers, torch_threads=0):
+        self.workers = workers
+        self.torch_threads = torch_threads
+        self._executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                             initargs=(torch_threads,))
+
+    def imap(self, jobs, batch_size=1, max_in_flight=None):
+        max_in_flight = max_in_flight or self.workers * 2
+        pending = deque()
+        for images, _ in jobs:
+            pending.append(self._executor.submit(_readtext_in_worker, images, batch_size))
+            if len(pending) >= max_in_flight:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+    def shutdown(self):
+        self._executor.shutdown(cancel_futures=True)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool(workers, torch_threads=0):
+    """
+    Returns a shared worker pool, replacing the existing one if the requested
+    size changed. torch_threads=0 splits the CPU cores evenly between workers.
+    """
+    global _pool
+    if not torch_threads:
+        torch_threads = max(1, (os.cpu_count() or 1) // workers)
+    with _pool_lock:
+        if _pool is not None and (_pool.workers, _pool.torch_threads) != (workers, torch_threads):
+            _pool.shutdown()
+            _pool = None
+        if _pool is None:
+            _pool = OCRProcessPool(workers, torch_threads)
+        return _pool
+
+
+def shutdown_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown()
+            _pool = None
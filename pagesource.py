@@ -0,0 +1,189 @@
+import os
+import re
+import subprocess
+from collections import namedtuple
+from dataclasses import dataclass
+from fractions import Fraction
+from math import floor
+
+import numpy as np
+
+
+@dataclass(frozen=True)
+class Region:
+    """
+    A strip of the check page, given as fractions of the page width/height,
+    plus how it should be rasterized.
+    """
+    name: str
+    left: Fraction
+    top: Fraction
+    right: Fraction
+    bottom: Fraction
+    dpi: int = 200
+    grayscale: bool = True
+
+    def box(self, width, height):
+        """Pixel box (left, top, right, bottom) of this region on a width x height page."""
+        return (floor(self.left * width), floor(self.top * height),
+                floor(self.right * width), floor(self.bottom * height))
+
+
+# Upper third holds the bank name and the "platite" account; the lower strip,
+# minus the right fifth and the bottom margin, holds the serial/account numbers.
+UPPER_REGION = Region("upper", Fraction(0), Fraction(0), Fraction(1), Fraction(1, 3))
+LOWER_REGION = Region("lower", Fraction(0), Fraction(2, 3), Fraction(4, 5), Fraction(14, 15))
+DEFAULT_REGIONS = (UPPER_REGION, LOWER_REGION)
+
+
+# pdf2image is imported where it is used, so importing this module (and with
+# it parsepdf) doesn't slow down the GUI's startup.
+
+# One PDF's page count, and the size of each page as
+# {page_number: (width, height)} in PostScript points, as the page is shown:
+# width and height are swapped for pages rotated by 90 or 270 degrees.
+PdfInfo = namedtuple("PdfInfo", ["pages", "page_sizes"])
+
+_PAGE_SIZE = re.compile(r"Page\s+(\d+) size")
+
+
+def read_pdf_info(pdf_path, poppler_path=None):
+    """Page count and per-page sizes of `pdf_path`, from a single pdfinfo run."""
+    from pdf2image import pdfinfo_from_path
+
+    # pdfinfo clamps the last page to the page count
+    info = pdfinfo_from_path(pdf_path, poppler_path=poppler_path, first_page=1, last_page=2 ** 31 - 1)
+    page_sizes = {}
+    for key, value in info.items():
+        match = _PAGE_SIZE.fullmatch(key)
+        if match is None:
+            continue
+        page_num = int(match.group(1))
+        width, height = (float(number) for number in re.findall(r"[\d.]+", value)[:2])
+        rotation = info.get(f"Page {page_num:4d} rot", "0")
+        if int(float(rotation or 0)) % 180 == 90:
+            width, height = height, width
+        page_sizes[page_num] = (width, height)
+    return PdfInfo(info["Pages"], page_sizes)
+
+
+def page_count(pdf_path, poppler_path=None):
+    from pdf2image import pdfinfo_from_path
+
+    return pdfinfo_from_path(pdf_path, poppler_path=poppler_path)["Pages"]
+
+
+def iter_pages(pdf_path, chunk_size=10, poppler_path=None, start_page=1, total=None):
+    """
+    Yields (page_number, PIL image) pairs from `start_page` on, rendering the
+    PDF in chunks of `chunk_size` pages. Each image is closed once the consumer
+    asks for the next page, so callers must not keep references to it.
+    `total` is the page count if the caller already knows it.
+    """
+    from pdf2image import convert_from_path
+
+    total = total or page_count(pdf_path, poppler_path)
+    print(f"Found {total} pages.")
+
+    for first_page in range(start_page, total + 1, chunk_size):
+        last_page = min(first_page + chunk_size - 1, total)
+        images = convert_from_path(pdf_path, first_page=first_page, last_page=last_page,
+                                   poppler_path=poppler_path)
+        for offset in range(len(images)):
+            image = images[offset]
+            images[offset] = None
+            yield first_page + offset, image
+            image.close()
+
+
+def crop_regions(image, regions=DEFAULT_REGIONS):
+    """Cuts an already rendered page into one PIL crop per region."""
+    width, height = image.size
+    return [image.crop(region.box(width, height)) for region in regions]
+
+
+def _split_pnm_stream(data):
+    """
+    Splits concatenated binary PNM images (P5 gray / P6 RGB, as written by
+    pdftoppm to stdout) into numpy arrays that view `data` without copying.
+    """
+    images = []
+    view = memoryview(data)
+    pos = 0
+    while pos < len(data):
+        fields = []
+        while len(fields) < 4:
+            while data[pos:pos + 1].isspace():
+                pos += 1
+            end = pos
+            while not data[end:end + 1].isspace():
+                end += 1
+            fields.append(data[pos:end])
+            pos = end
+        pos += 1  # single whitespace byte before the raster
+        magic, width, height = fields[0], int(fields[1]), int(fields[2])
+        channels = 1 if magic == b"P5" else 3
+        size = width * height * channels
+        shape = (height, width) if channels == 1 else (height, width, channels)
+        images.append(np.frombuffer(view[pos:pos + size], dtype=np.uint8).reshape(shape))
+        pos += size
+    return images
+
+
+def render_region(pdf_path, first_page, last_page, region, page_size, poppler_path=None):
+    """
+    Asks pdftoppm to rasterize only `region` of pages first_page..last_page and
+    returns one uint8 array per page.
+    """
+    page_width = page_size[0] * region.dpi / 72
+    page_height = page_size[1] * region.dpi / 72
+    left, top, right, bottom = region.box(page_width, page_height)
+
+    command = [os.path.join(poppler_path, "pdftoppm") if poppler_path else "pdftoppm",
+               "-f", str(first_page), "-l", str(last_page), "-r", str(region.dpi),
+               "-x", str(left), "-y", str(top), "-W", str(right - left), "-H", str(bottom - top)]
+    if region.grayscale:
+        command.append("-gray")
+    command.append(pdf_path)
+
+    result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True)
+    return _split_pnm_stream(result.stdout)
+
+
+def _runs_of_equal_size(page_sizes, first_page, last_page):
+    """Splits first_page..last_page into (first, last, size) runs of pages of the same size."""
+    runs = []
+    for page_num in range(first_page, last_page + 1):
+        size = page_sizes[page_num]
+        if runs and runs[-1][2] == size:
+            runs[-1][1] = page_num
+        else:
+            runs.append([page_num, page_num, size])
+    return runs
+
+
+def iter_region_pages(pdf_path, regions=DEFAULT_REGIONS, chunk_size=10, poppler_path=None, start_page=1,
+                      pdf_info=None):
+    """
+    Yields (page_number, [array per region]) from `start_page` on, without ever
+    rendering a full page: each region is rasterized on its own, at its own
+    DPI, `chunk_size` pages at a time. Regions are placed on each page by its
+    own size and rotation, so scans with mixed page formats are cut right.
+    `pdf_info` is read_pdf_info() of the PDF if the caller already has it.
+    """
+    pdf_info = pdf_info or read_pdf_info(pdf_path, poppler_path)
+    total = pdf_info.pages
+    print(f"Found {total} pages.")
+
+    for first_page in range(start_page, total + 1, chunk_size):
+        last_page = min(first_page + chunk_size - 1, total)
+        for run_first, run_last, page_size in _runs_of_equal_size(pdf_info.page_sizes, first_page, last_page):
+            per_region = [render_region(pdf_path, run_first, run_last, region, page_size, poppler_path)
+                          for region in regions]
+            expected = run_last - run_first + 1
+            for region, arrays in zip(regions, per_region):
+                if len(arrays) != expected:
+                    raise RuntimeError(f"pdftoppm returned {len(arrays)} images of region '{region.name}' "
+                                       f"for pages {run_first}-{run_last} of {pdf_path}, expected {expected}")
+            for offset, crops in enumerate(zip(*per_region)):
+                yield run_first + offset, list(crops)
@@ -1,11 +1,115 @@
 import os
+import time
+from collections import deque, namedtuple
+from dataclasses import dataclass
 
-import easyocr
-from google.cloud import vision
-from pdf2image import convert_from_path
 import numpy as np
 import re
-import pprint
+
+from croparchive import DEFAULT_CROPS_DIR, CropArchiveWriter, crop_name
+from dupindex import duplicate_keys
+from checkrules import DEFAULT_RULES_PATH, Token, get_rules
+from ocrcache import DEFAULT_CACHE_PATH, DEFAULT_MAX_BYTES, get_cache, make_key
+from ocrbackend import CascadeEngine, TesseractEngine
+from ocrengine import EasyOCREngine, get_engine, get_pool
+from visionbackend import MAX_IMAGES_PER_REQUEST, get_backend
+from pagesource import DEFAULT_REGIONS, crop_regions, iter_pages, iter_region_pages, read_pdf_info
+from pipelinestats import PipelineStats, profile_run
+
+
+# Poppler binaries bundled for Windows, found relative to this file so the
+# working directory doesn't matter; elsewhere poppler-utils on PATH is used.
+POPPLER_PATH = (os.path.join(os.path.dirname(os.path.abspath(__file__)), 'poppler-24.08.0', 'Library', 'bin')
+                if os.name == 'nt' else None)
+
+# Tokens below this confidence are left out of parsing and of the raw text
+MIN_CONFIDENCE = 0.2
+
+# One OCR'd page: its 1-based number and the tokens of each region, keyed by
+# region name in the order of PipelineSettings.regions.
+PageRecord = namedtuple("PageRecord", ["page_num", "regions"])
+
+
+@dataclass
+class PipelineSettings:
+    """
+    Tunables for the PDF -> OCR pipeline.
+    - chunk_size: how many pages poppler rasterizes at once. Only one chunk is
+      held in memory at a time, so peak memory does not depend on page count.
+    - workers: number of OCR worker processes. 1 runs OCR in this process.
+    - torch_threads: torch threads per worker process; 0 divides the CPU cores
+      evenly between the workers so they don't oversubscribe each other.
+    - batch_size: pages whose crops are OCR'd together in one batched EasyOCR
+      call. 1 keeps the one-crop-at-a-time behaviour.
+    - regions: the strips of the page to OCR, with their DPI and colour mode.
+      The first region is the upper part, the second the lower part.
+    - render_regions: rasterize only the regions with pdftoppm instead of
+      rendering whole pages in RGB and cropping them.
+    - cache_path: SQLite file of the OCR result cache; None disables caching.
+    - cache_max_bytes: size cap of the cache before LRU eviction kicks in.
+    - rules_path: JSON config of the field extraction rules (banks, account formats).
+    - save_crops: keep the crops for verification in a '.crops.zip' archive
+      per PDF (see croparchive.crop_name).
+    - crops_dir: directory of those archives, shared with the GUI.
+    - vision_endpoint: base URL of a Vision REST endpoint (e.g. fakevision.py);
+      None uses the official Google client.
+    - vision_batch_size: crops per Vision images:annotate request (max 16).
+    - vision_max_in_flight: Vision requests allowed to run at the same time.
+    - backend: local OCR engine, "easyocr", "tesseract" or "cascade".
+    - cascade_tiers: engines of the cascade, cheapest first ("tesseract",
+      "easyocr" or "google").
+    - cascade_threshold: field confidence below which a crop is escalated to
+      the next tier of the cascade.
+    - profile_dir: directory for a JSON timing report of each run
+      ('<pdf name>.profile.json'); None writes no report.
+    - cprofile: also run cProfile over each run and save '<pdf name>.prof'
+      in profile_dir.
+    """
+    chunk_size: int = 10
+    workers: int = 1
+    torch_threads: int = 0
+    batch_size: int = 1
+    regions: tuple = DEFAULT_REGIONS
+    render_regions: bool = True
+    cache_path: str = DEFAULT_CACHE_PATH
+    cache_max_bytes: int = DEFAULT_MAX_BYTES
+    rules_path: str = DEFAULT_RULES_PATH
+    save_crops: bool = True
+    crops_dir: str = DEFAULT_CROPS_DIR
+    vision_endpoint: str = None
+    vision_batch_size: int = MAX_IMAGES_PER_REQUEST
+    vision_max_in_flight: int = 4
+    backend: str = "easyocr"
+    cascade_tiers: tuple = ("tesseract", "easyocr")
+    cascade_threshold: float = 0.6
+    profile_dir: str = None
+    cprofile: bool = False
+
+
+DEFAULT_SETTINGS = PipelineSettings()
+
+
+def make_engine(settings, name=None):
+    """Builds the OCR engine called `name` (default settings.backend)."""
+    name = name or settings.backend
+    if name == "easyocr":
+        # With a worker pool this instance only identifies results for the cache
+        return EasyOCREngine() if settings.workers > 1 else get_engine()
+    if name == "tesseract":
+        return TesseractEngine()
+    if name == "google":
+        return get_backend(settings.vision_endpoint, settings.vision_batch_size, settings.vision_max_in_flight)
+    if name == "cascade":
+        tiers = [get_engine() if tier == "easyocr" else make_engine(settings, tier)
+                 for tier in settings.cascade_tiers]
+        return CascadeEngine(tiers, get_rules(settings.rules_path), settings.cascade_threshold, MIN_CONFIDENCE)
+    raise ValueError(f"Unknown OCR backend: {name}")
+
+
+def open_cache(settings):
+    if settings.cache_path is None:
+        return None
+    return get_cache(settings.cache_path, settings.cache_max_bytes)
 
 
 def parse_check_info(page_text):
@@ -14,62 +118,17 @@ def parse_check_info(page_text):
     - Upper part contains Bank Name and "Platite" account number.
     - Lower part contains exactly two numbers (Serial and Tekući).
     """
-    info = {
-        "bank_name": None,
-        "platite_racun_br": None,
-        "broj_tekuceg_racuna": None,
-        "serijski_broj": None
-    }
-
-    # --- 1. Split the page into upper and lower parts ---
     parts = page_text.split('#############')
     upper_text = parts[0]
     lower_text = parts[1] if len(parts) > 1 else ""
+    return parse_check_regions(upper_text, lower_text)
 
-    # --- 2. Process the Upper Part ---
-    # Bank name logic remains the same, applied only to the upper text
-    bank_pattern = re.compile(
-        r"(Erste Bank a\.d\. Novi Sad|BANKA POSTANSKA ŠTEDIONICA|otpbanka|UniCredit Bank |BANCA INTESA|NLB Komercijalna banka)",
-        re.IGNORECASE
-    )
-    match = bank_pattern.search(upper_text)
-    if match:
-        info["bank_name"] = match.group(1).strip()
-
-    # "Platite" number is always in the upper part
-    platite_pattern = re.compile(r"(\d{3}-\d{5,}-\d{2})")
-    match = platite_pattern.search(upper_text)
-    if match:
-        info["platite_racun_br"] = match.group(1)
-
-    # --- 3. Process the Lower Part ---
-    # Find all potential numbers (long alphanumeric strings or hyphenated strings)
-    number_pattern = re.compile(r"(\b\d{3}\b|\b[\d-]{10,}\w?\b)")
-    numbers_found = number_pattern.findall(lower_text)
-
-    final_numbers = []
-    if len(numbers_found) == 3:
-        # Rule: If there are 3 numbers, concatenate the 2nd and 3rd
-        final_numbers = [numbers_found[0], numbers_found[1] + numbers_found[2]]
-    elif len(numbers_found) == 2:
-        final_numbers = numbers_found
-    elif len(numbers_found) == 1:
-        # If only one number is found in the lower part, we'll assume it's the serial number
-        info["serijski_broj"] = numbers_found[0]
-
-    # Assign the two final numbers to the correct fields
-    if len(final_numbers) == 2:
-        num1, num2 = final_numbers
-        # Heuristic: The number with a hyphen or a known bank prefix is the "tekući račun"
-        if '-' in num1 or num1.startswith(('200', '340', '325', '170')):
-            info["broj_tekuceg_racuna"] = str(num1)
-            info["serijski_broj"] = str(num2)
-        else:
-            info["broj_tekuceg_racuna"] = str(num2)
-            info["serijski_broj"] = num1
 
-    return info
+def parse_check_regions(upper_text, lower_text, rules=None):
+    """Parses the text of the upper and lower part of one check (see check_rules.json)."""
+    return (rules or get_rules()).parse_text(upper_text, lower_text)
 def split_and_print(raw_output):
+    """Parses a raw-text dump written by parse_from_pdf(raw_text_path=...)."""
     # Split the raw output by the "--- Page X ---" delimiter
     pages = re.split(r'--- Page \d+ ---', raw_output)
 
@@ -81,107 +140,281 @@ def split_and_print(raw_output):
             print(f"Parsing Page {i}...")
             parsed_info = parse_check_info(page_content)
             all_checks_data.append(parsed_info)
-
-    # Pretty print the final results
-    print("\n--- PARSED DATA ---")
-    pprint.pprint(all_checks_data)
     return all_checks_data
-def read(pdf_path):
-    try:
-        pdf_name =  os.path.basename(pdf_path)
-
-        reader = easyocr.Reader(['rs_latin', 'en'])
-
-        print(f"Converting {pdf_path} to images...")
-        images = convert_from_path(pdf_path, poppler_path=r'poppler-24.08.0\Library\bin')
-        print(f"Found {len(images)} pages.")
-
-        full_text = ""
-
-        for i, image in enumerate(images):
-            print(f"Reading page {i + 1}...")
-
-            width, height = image.size
 
-            upper_crop = image.crop((0, 0, width, height // 3))
-            lower_crop = image.crop((0, 2 * height // 3, width-width/5, height-height/15))
-            upper_crop.save(f"{pdf_name}_{i + 1}_upper.png")
-            lower_crop.save(f"{pdf_name}_{i + 1}_lower.png")
 
-            result_upper = reader.readtext(np.array(upper_crop, dtype=np.uint8))
-            result_lower = reader.readtext(np.array(lower_crop, dtype=np.uint8))
+def is_confident(token):
+    return token.confidence is None or token.confidence > MIN_CONFIDENCE
 
-            upper_text = "\n".join([f"{text} (Confidence: {prob:.2%})"
-                                    for bbox, text, prob in result_upper if prob > 0.2])
 
-            lower_text = "\n".join([f"{text} (Confidence: {prob:.2%})"
-                                    for bbox, text, prob in result_lower if prob > 0.2])
+def format_token(token):
+    if token.confidence is None:
+        return token.text.strip()
+    return f"{token.text} (Confidence: {token.confidence:.2%})"
 
-            full_text += f"--- Page {i + 1} ---\n"
-            full_text += upper_text + "\n" +"#############"+ "\n" + lower_text + "\n"
 
+def format_page_record(record):
+    """Raw-text dump of one page, in the '--- Page N ---' / '#############' layout."""
+    region_texts = ["\n".join(format_token(token) for token in tokens if is_confident(token))
+                    for tokens in record.regions.values()]
+    return f"--- Page {record.page_num} ---\n" + "\n#############\n".join(region_texts) + "\n"
 
 
-        print("\nOCR complete! Text saved to output_easyocr.txt")
-        return  full_text
+def parse_page_record(record, rules=None):
+    """
+    Parses a page record into the check fields. Its 'confidence' maps each
+    field to the lowest OCR confidence of the tokens it was read from (see
+    CheckRules.parse_tokens), so doubtful fields can be pointed out for review.
+    """
+    regions = [[token for token in tokens if is_confident(token)] for tokens in record.regions.values()]
+    info, confidence = (rules or get_rules()).parse_tokens(regions[0], regions[1] if len(regions) > 1 else [])
+    info["confidence"] = confidence
+    return info
 
 
-    except Exception as e:
-        print(f"An error occurred: {e}")
-def parse_from_pdf(pdf_path, use_google=False):
-    if use_google:
-        output=read_with_google(pdf_path)
+def iter_page_crops(pdf_path, settings, poppler_path=None, start_page=1, stats=None):
+    """
+    Yields (page_number, [array per region]) from `start_page` on. With
+    settings.save_crops the crops are also handed to a background writer that
+    archives them for the GUI.
+    """
+    stats = stats or PipelineStats()
+    # One pdfinfo run serves the progress total and the region placement
+    pdf_info = read_pdf_info(pdf_path, poppler_path)
+    stats.start(max(0, pdf_info.pages - start_page + 1))
+    if settings.render_regions:
+        pages = iter_region_pages(pdf_path, settings.regions, settings.chunk_size, poppler_path, start_page,
+                                  pdf_info)
     else:
-        output=read(pdf_path)
-
-    pdf_name = os.path.basename(pdf_path)
-    final_output=split_and_print(output)
-    with open(f'{pdf_name}.txt', 'w', encoding='utf-8') as f:
-        f.write(str(output))
-    return final_output
-def read_with_google(pdf_path):
-    pdf_name = os.path.basename(pdf_path)
-    client = vision.ImageAnnotatorClient()
+        pages = ((page_num, [np.array(crop, dtype=np.uint8) for crop in crop_regions(image, settings.regions)])
+                 for page_num, image in iter_pages(pdf_path, settings.chunk_size, poppler_path, start_page,
+                                                   pdf_info.pages))
 
+    writer = (CropArchiveWriter(crop_name(pdf_path), settings.crops_dir, start_page=start_page, stats=stats)
+              if settings.save_crops else None)
+    try:
+        while True:
+            with stats.stage("render"):
+                page = next(pages, None)
+            if page is None:
+                break
+            page_num, crops = page
+            print(f"Reading page {page_num}...")
+            if writer is not None:
+                with stats.stage("crop_queue"):
+                    for region, crop in zip(settings.regions, crops):
+                        writer.add(page_num, region.name, crop)
+            yield page_num, crops
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+
+def iter_page_batches(page_crops, pages_per_batch):
+    """Groups (page_number, crops) pairs into lists of at most `pages_per_batch` pages."""
+    batch = []
+    for page in page_crops:
+        batch.append(page)
+        if len(batch) >= pages_per_batch:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def ocr_pages(page_crops, settings, engine=None, cache=None, pages_per_job=None, stats=None):
+    """
+    Runs an OCR engine (an ocrbackend.OCRBackend, EasyOCR by default) over a stream of
+    (page_number, [crop per region]) pairs and yields (page_number, [tokens per
+    region]) in page order.
+    Crops of `pages_per_job` pages (default settings.batch_size) are sent to the
+    engine together; with EasyOCR and `settings.workers` > 1 those jobs are
+    spread over a process pool. Crops found in `cache` skip OCR entirely.
+    """
+    batches = iter(iter_page_batches(page_crops, max(1, pages_per_job or settings.batch_size)))
+    regions = settings.regions
+    engine = engine or make_engine(settings)
+    stats = stats or PipelineStats()
+    stats.watch("engine", engine)
+    stats.watch("cache", cache)
+    pending = deque()
+    # What identifies the engine's results in the cache, read once per run:
+    # some engines look these up (package metadata, every cascade tier)
+    if cache is not None:
+        engine_name, engine_version, engine_settings = engine.name, engine.version, engine.settings_key()
+    # Engines pull jobs while we wait on them, so the time spent producing
+    # jobs (rendering, cache lookups) is kept apart from OCR time.
+    upstream_seconds = [0.0]
+
+    def jobs():
+        # Each job carries only the crops that missed the cache; `pending`
+        # remembers where their results go once the job comes back.
+        while True:
+            started = time.perf_counter()
+            batch = next(batches, None)
+            if batch is None:
+                upstream_seconds[0] += time.perf_counter() - started
+                return
+            crops = [crop for _, crops_of_page in batch for crop in crops_of_page]
+            keys = [None] * len(crops)
+            results = [None] * len(crops)
+            if cache is not None:
+                with stats.stage("cache_lookup"):
+                    for i, crop in enumerate(crops):
+                        keys[i] = make_key(crop, regions[i % len(regions)], engine_name,
+                                           engine_version, engine_settings)
+                        results[i] = cache.get(keys[i])
+            pending.append(([page_num for page_num, _ in batch], keys, results))
+            misses = [i for i, result in enumerate(results) if result is None]
+            stats.count("crops", len(crops))
+            stats.count("crops_ocred", len(misses))
+            upstream_seconds[0] += time.perf_counter() - started
+            yield [crops[i] for i in misses], [regions[i % len(regions)].name for i in misses]
+
+    if settings.workers > 1 and isinstance(engine, EasyOCREngine):
+        # Batches are dispatched to the pool as soon as they are rendered;
+        # imap() hands the results back in submission order.
+        pool = get_pool(settings.workers, settings.torch_threads)
+        fresh_results = pool.imap(jobs(), settings.batch_size)
+    else:
+        fresh_results = engine.imap(jobs(), settings.batch_size)
+
+    while True:
+        started, upstream_before = time.perf_counter(), upstream_seconds[0]
+        fresh = next(fresh_results, None)
+        stats.add_time("ocr", time.perf_counter() - started - (upstream_seconds[0] - upstream_before))
+        if fresh is None:
+            break
+        page_nums, keys, results = pending.popleft()
+        fresh = iter(fresh)
+        for i in range(len(results)):
+            if results[i] is None:
+                results[i] = next(fresh)
+                if cache is not None:
+                    with stats.stage("cache_store"):
+                        cache.put(keys[i], engine_name, engine_version, results[i])
+        for k, page_num in enumerate(page_nums):
+            yield page_num, results[k * len(regions):(k + 1) * len(regions)]
+
+
+def make_page_record(page_num, results, regions):
+    return PageRecord(page_num, {region.name: [Token(text, prob, bbox) for bbox, text, prob in tokens]
+                                 for region, tokens in zip(regions, results)})
+
+
+def iter_local_records(pdf_path, settings=None, engine=None, start_page=1, stats=None):
+    """Page records from a local engine: `engine`, or the one named by settings.backend."""
+    settings = settings or DEFAULT_SETTINGS
+    engine = engine or make_engine(settings)
+    stats = stats or PipelineStats()
     print(f"Converting {pdf_path} to images...")
-    images = convert_from_path(pdf_path)
-    print(f"Found {len(images)} pages.")
+    page_crops = iter_page_crops(pdf_path, settings, POPPLER_PATH, start_page, stats)
+    for page_num, results in ocr_pages(page_crops, settings, engine, open_cache(settings), stats=stats):
+        yield make_page_record(page_num, results, settings.regions)
+    if isinstance(engine, CascadeEngine):
+        print(f"OCR cascade: {engine.report()}")
 
-    full_text = ""
-    for i, image in enumerate(images):
-        print(f"Reading page {i + 1} (Google Vision)...")
 
-        width, height = image.size
-        upper_crop = image.crop((0, 0, width, height // 3))
-        lower_crop = image.crop((0, 2 * height // 3, width - width / 5, height - height / 15))
+def iter_google_records(pdf_path, settings=None, backend=None, start_page=1, stats=None):
+    settings = settings or DEFAULT_SETTINGS
+    backend = backend or make_engine(settings, "google")
+    stats = stats or PipelineStats()
+    # Fill each images:annotate request with as many pages as fit in it
+    pages_per_job = max(settings.batch_size, backend.batch_size // len(settings.regions))
 
-        # Save debug images
-        upper_crop.save(f"{pdf_name}_{i + 1}_upper.png")
-        lower_crop.save(f"{pdf_name}_{i + 1}_lower.png")
+    print(f"Converting {pdf_path} to images (Google Vision)...")
+    page_crops = iter_page_crops(pdf_path, settings, POPPLER_PATH, start_page, stats)
+    for page_num, results in ocr_pages(page_crops, settings, backend, open_cache(settings), pages_per_job, stats):
+        yield make_page_record(page_num, results, settings.regions)
 
-        # OCR upper
-        with open(f"{pdf_name}_{i + 1}_upper.png", "rb") as img_file:
-            content = img_file.read()
-        response = client.text_detection(image=vision.Image(content=content))
-        upper_text = response.full_text_annotation.text
 
-        # OCR lower
-        with open(f"{pdf_name}_{i + 1}_lower.png", "rb") as img_file:
-            content = img_file.read()
-        response = client.text_detection(image=vision.Image(content=content))
-        lower_text = response.full_text_annotation.text
+def iter_page_records(pdf_path, use_google=False, settings=None, engine=None, start_page=1, stats=None):
+    """
+    Yields one PageRecord per page from `start_page` on, as soon as the page
+    has been OCR'd. Stage timings and counters go to `stats` (a
+    pipelinestats.PipelineStats); the caller reports each finished page to it.
+    """
+    if use_google:
+        return iter_google_records(pdf_path, settings, start_page=start_page, stats=stats)
+    return iter_local_records(pdf_path, settings, engine, start_page, stats)
 
-        full_text += f"--- Page {i + 1} ---\n"
-        full_text += upper_text.strip() + "\n#############\n" + lower_text.strip() + "\n"
 
-    return full_text
+def flag_duplicate(info, page_num, find_duplicates, seen):
+    """
+    Describes what `info` duplicates: a stored check, looked up with
+    `find_duplicates(info)` (e.g. CheckStore.duplicate_of), or an earlier page
+    of the same run, remembered in `seen`. Returns '' if it is new.
+    """
+    keys = duplicate_keys(info)
+    flag = find_duplicates(info) if find_duplicates is not None else ""
+    if not flag:
+        for key in keys:
+            if key in seen:
+                flag = f"{key[0]} duplicate of page {seen[key]} of this PDF"
+                break
+    for key in keys:
+        seen.setdefault(key, page_num)
+    return flag
+
+
+def iter_parsed_pages(pdf_path, use_google=False, settings=None, engine=None, raw_text_file=None, stats=None,
+                      find_duplicates=None):
+    """
+    Yields the parsed check fields of each page as soon as the page is OCR'd.
+    If `raw_text_file` is given, the raw text of every page is written to it too.
+    Each page's 'duplicate_of' says which stored check (via `find_duplicates`)
+    or earlier page it repeats, or is ''.
+    """
+    rules = get_rules((settings or DEFAULT_SETTINGS).rules_path)
+    stats = stats or PipelineStats()
+    seen = {}
+    for record in iter_page_records(pdf_path, use_google, settings, engine, stats=stats):
+        if raw_text_file is not None:
+            raw_text_file.write(format_page_record(record))
+        print(f"Parsing Page {record.page_num}...")
+        with stats.stage("parse"):
+            info = parse_page_record(record, rules)
+        with stats.stage("duplicates"):
+            info["duplicate_of"] = flag_duplicate(info, record.page_num, find_duplicates, seen)
+        if info["duplicate_of"]:
+            stats.count("duplicates")
+            print(f"Page {record.page_num}: possible {info['duplicate_of']}")
+        stats.page_done(record.page_num)
+        yield info
+
+
+def read(pdf_path, settings=None, engine=None):
+    try:
+        full_text = "".join(format_page_record(record)
+                            for record in iter_local_records(pdf_path, settings, engine))
+        print("\nOCR complete!")
+        return full_text
+    except Exception as e:
+        print(f"An error occurred: {e}")
+def parse_from_pdf(pdf_path, use_google=False, settings=None, engine=None, raw_text_path=None, stats=None,
+                   find_duplicates=None):
+    """
+    OCRs and parses every page of `pdf_path` and returns one dict of check
+    fields per page. With `raw_text_path` the raw OCR text is saved there too.
+    Pass a pipelinestats.PipelineStats as `stats` to follow progress or read
+    the timings afterwards, and e.g. CheckStore.duplicate_of as
+    `find_duplicates` to flag checks that were already processed.
+    """
+    settings = settings or DEFAULT_SETTINGS
+    stats = stats or PipelineStats()
+    with profile_run(stats, pdf_path, settings.profile_dir, settings.cprofile):
+        if raw_text_path is None:
+            return list(iter_parsed_pages(pdf_path, use_google, settings, engine, stats=stats,
+                                          find_duplicates=find_duplicates))
+        with open(raw_text_path, 'w', encoding='utf-8') as f:
+            return list(iter_parsed_pages(pdf_path, use_google, settings, engine, raw_text_file=f, stats=stats,
+                                          find_duplicates=find_duplicates))
+def read_with_google(pdf_path, settings=None):
+    return "".join(format_page_record(record) for record in iter_google_records(pdf_path, settings))
 
 if __name__ == '__main__':
-    os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = r"E:\DevTools\vision-key.json"
-
-    pdf_path = 'scanned_document.pdf'
-    pdf_name = os.path.basename(pdf_path)
-    output=parse_from_pdf(pdf_path, True)
-    with open(f'{pdf_name}.txt', 'w', encoding='utf-8') as f:
-        f.write(str(output))
-
+    # Command line use goes through the batch runner, e.g.
+    #   python parsepdf.py scanned_document.pdf --google --raw-text
+    import batchcli
+    raise SystemExit(batchcli.main())
@@ -0,0 +1,196 @@
+import cProfile
+import json
+import math
+import os
+import sys
+import threading
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+
+
+# What a PipelineStats listener receives.
+# - kind: "start" (total_pages known), "page" (a page finished) or "finish".
+# - eta: estimated seconds left, None until the first page is done.
+ProgressEvent = namedtuple("ProgressEvent", ["kind", "page_num", "pages_done", "total_pages", "elapsed", "eta"])
+
+
+def peak_rss_bytes():
+    """Peak resident memory of this process so far, or None if the platform can't tell."""
+    if sys.platform == "win32":
+        import ctypes
+        from ctypes import wintypes
+
+        class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+            _fields_ = [("cb", wintypes.DWORD), ("PageFaultCount", wintypes.DWORD),
+                        ("PeakWorkingSetSize", ctypes.c_size_t), ("WorkingSetSize", ctypes.c_size_t),
+                        ("QuotaPeakPagedPoolUsage", ctypes.c_size_t), ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                        ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t), ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                        ("PagefileUsage", ctypes.c_size_t), ("PeakPagefileUsage", ctypes.c_size_t)]
+
+        counters = PROCESS_MEMORY_COUNTERS()
+        counters.cb = ctypes.sizeof(counters)
+        process = ctypes.windll.kernel32.GetCurrentProcess()
+        if not ctypes.windll.psapi.GetProcessMemoryInfo(process, ctypes.byref(counters), counters.cb):
+            return None
+        return counters.PeakWorkingSetSize
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of `values` (fraction in [0, 1]); None if empty."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+
+class PipelineStats:
+    """
+    Timings and counters of one pipeline run.
+    - stage(name) times a block; per-stage totals and call counts add up over
+      the run. Stages may be timed from several threads (e.g. PNG encoding on
+      the crop writer thread), so totals can exceed the wall time.
+    - page_done() records per-page latency (time between finished pages) and
+      tells `listener` how far along the run is, with an ETA.
+    - watch(name, source) snapshots `source.counters()` (an OCR engine) or
+      hits/misses (an OCR cache) so the report shows what this run added.
+    `listener(event)` gets ProgressEvents on whatever thread the pipeline runs.
+    """
+
+    def __init__(self, listener=None):
+        self.listener = listener
+        self.total_pages = None
+        self.pages_done = 0
+        self.page_times = []
+        self.stages = {}
+        self.counts = {}
+        self._sources = {}
+        self._lock = threading.Lock()
+        self._started = time.perf_counter()
+        self._last_page = self._started
+        self._finished = None
+
+    def _emit(self, kind, page_num=None):
+        if self.listener is None:
+            return
+        elapsed = time.perf_counter() - self._started
+        eta = None
+        if self.total_pages and self.pages_done:
+            eta = elapsed / self.pages_done * max(0, self.total_pages - self.pages_done)
+        self.listener(ProgressEvent(kind, page_num, self.pages_done, self.total_pages, elapsed, eta))
+
+    def start(self, total_pages):
+        """Called once the number of pages to process is known."""
+        self.total_pages = total_pages
+        self._started = self._last_page = time.perf_counter()
+        self._emit("start")
+
+    @contextmanager
+    def stage(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - started)
+
+    def add_time(self, name, seconds):
+        with self._lock:
+            total, calls = self.stages.get(name, (0.0, 0))
+            self.stages[name] = (total + seconds, calls + 1)
+
+    def count(self, name, n=1):
+        with self._lock:
+            self.counts[name] = self.counts.get(name, 0) + n
+
+    def page_done(self, page_num):
+        now = time.perf_counter()
+        with self._lock:
+            self.page_times.append(now - self._last_page)
+            self._last_page = now
+            self.pages_done += 1
+        self._emit("page", page_num)
+
+    def watch(self, name, source):
+        if source is not None and name not in self._sources:
+            self._sources[name] = (source, self._snapshot(source))
+
+    @staticmethod
+    def _snapshot(source):
+        if hasattr(source, "counters"):
+            return dict(source.counters())
+        return {"hits": source.hits, "misses": source.misses}
+
+    def finish(self):
+        if self._finished is None:
+            self._finished = time.perf_counter()
+            self._emit("finish")
+
+    def report(self):
+        """Everything measured so far, as a JSON-friendly dict."""
+        wall = (self._finished or time.perf_counter()) - self._started
+        with self._lock:
+            stages = {name: {"seconds": round(total, 6), "calls": calls,
+                             "per_page": round(total / self.pages_done, 6) if self.pages_done else None}
+                      for name, (total, calls) in sorted(self.stages.items(), key=lambda item: -item[1][0])}
+            page_times = list(self.page_times)
+            counts = dict(self.counts)
+        sources = {}
+        for name, (source, before) in self._sources.items():
+            after = self._snapshot(source)
+            sources[name] = {key: (value - before.get(key, 0) if isinstance(value, (int, float)) else value)
+                             for key, value in after.items()}
+        return {
+            "pages": self.pages_done,
+            "total_pages": self.total_pages,
+            "wall_seconds": round(wall, 6),
+            "pages_per_second": round(self.pages_done / wall, 3) if wall > 0 else None,
+            "page_seconds": {"p50": percentile(page_times, 0.5), "p95": percentile(page_times, 0.95),
+                             "p99": percentile(page_times, 0.99), "max": max(page_times) if page_times else None},
+            "peak_rss_bytes": peak_rss_bytes(),
+            "stages": stages,
+            "counts": counts,
+            "sources": sources,
+        }
+
+    def save_report(self, path, **extra):
+        """Writes report() (plus any `extra` fields, e.g. the PDF name) to `path` as JSON."""
+        report = dict(extra, **self.report())
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        return report
+
+
+@contextmanager
+def profile_run(stats, pdf_path, profile_dir=None, cprofile=False):
+    """
+    Wraps one PDF run. With `profile_dir`, the run's report is saved there as
+    '<pdf name>.profile.json'; with `cprofile` too, cProfile runs for the whole
+    block and its stats go to '<pdf name>.prof' (open with pstats or snakeviz).
+    Only the calling thread is profiled, and only one run at a time can be.
+    """
+    profiler = cProfile.Profile() if cprofile and profile_dir else None
+    if profiler is not None:
+        try:
+            profiler.enable()
+        except ValueError:
+            print(f"cProfile is already running elsewhere; not profiling {pdf_path}.")
+            profiler = None
+    try:
+        yield stats
+    finally:
+        if profiler is not None:
+            profiler.disable()
+        stats.finish()
+        if profile_dir:
+            os.makedirs(profile_dir, exist_ok=True)
+            name = os.path.basename(pdf_path)
+            if profiler is not None:
+                profiler.dump_stats(os.path.join(profile_dir, f"{name}.prof"))
+            stats.save_report(os.path.join(profile_dir, f"{name}.profile.json"), pdf_path=pdf_path)
@@ -0,0 +1,142 @@
+"""
+Synthetic Serbian check PDFs with known contents, for benchmarking.
+Bank names and account formats come from check_rules.json, laid out where
+pagesource's regions look for them: bank name and "Platite" account in the
+upper third, serial number and current account in the lower strip.
+
+    python synthchecks.py bench.pdf --pages 50 --noise 0.3
+"""
+import argparse
+import json
+import random
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFilter, ImageFont
+
+from checkrules import DEFAULT_RULES_PATH
+
+
+PAGE_SIZE = (1600, 720)   # pixels at DPI, roughly the size of a real check
+DPI = 200
+BRANCHES = ["Filijala Beograd", "Filijala Novi Sad", "Filijala Niš", "Ekspozitura Kragujevac",
+            "Filijala Subotica", "Ekspozitura Čačak"]
+FONT_CANDIDATES = ["DejaVuSans.ttf", "arial.ttf", "Arial.ttf", "LiberationSans-Regular.ttf"]
+
+
+def load_font(size):
+    """A TrueType font with Serbian Latin glyphs if one is installed, else Pillow's default."""
+    for name in FONT_CANDIDATES:
+        try:
+            return ImageFont.truetype(name, size)
+        except OSError:
+            continue
+    return ImageFont.load_default(size)
+
+
+def load_config(rules_path=DEFAULT_RULES_PATH):
+    with open(rules_path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _digits(rng, count):
+    return "".join(rng.choice("0123456789") for _ in range(count))
+
+
+def make_check(rng, config):
+    """
+    One check's printed lines and the fields the parser should read from them.
+    The lower line is printed either as 'serial  340-0000012345678-12' or as
+    'serial  340  000001234567812'; in the second form the account is the
+    prefix and the rest run together, as parse_check_regions() joins them.
+    """
+    bank = rng.choice(config["banks"])
+    alias = rng.choice(bank.get("aliases") or [bank["name"]])
+    prefix = rng.choice(config["account_prefixes"])
+
+    platite = f"{prefix}-{_digits(rng, 13)}-{_digits(rng, 2)}"
+    # Serial numbers that start like an account prefix would be taken for the account
+    serial = _digits(rng, 10)
+    while serial.startswith(tuple(config["account_prefixes"])):
+        serial = _digits(rng, 10)
+
+    body, check_digits = _digits(rng, 13), _digits(rng, 2)
+    if rng.random() < 0.5:
+        account = f"{prefix}-{body}-{check_digits}"
+        lower_line = f"{serial}     {account}"
+    else:
+        account = f"{prefix}{body}{check_digits}"
+        lower_line = f"{serial}     {prefix}   {body}{check_digits}"
+
+    return {
+        "upper": [f"{alias.strip()} {rng.choice(BRANCHES)}", f"Platite sa računa br. {platite}"],
+        "lower": [lower_line],
+        "truth": {"bank_name": bank["name"], "platite_racun_br": platite,
+                  "broj_tekuceg_racuna": account, "serijski_broj": serial},
+    }
+
+
+def render_check(check, noise=0.0, rng=None):
+    """
+    Draws a check as a grayscale page. `noise` in [0, 1] adds scanner-like
+    damage: speckle, blur and a slight skew.
+    """
+    rng = rng or random.Random(0)
+    width, height = PAGE_SIZE
+    image = Image.new("L", PAGE_SIZE, 255)
+    draw = ImageDraw.Draw(image)
+    font = load_font(34)
+    small = load_font(24)
+
+    draw.rectangle([10, 10, width - 10, height - 10], outline=0, width=3)
+    y = 40
+    for line in check["upper"]:
+        draw.text((60, y), line, fill=0, font=font)
+        y += 60
+    draw.text((60, height // 2 - 20), "Iznos: ______________    Datum: __________", fill=90, font=small)
+    y = int(height * 2 / 3) + 40
+    for line in check["lower"]:
+        draw.text((60, y), line, fill=0, font=font)
+        y += 50
+
+    if noise > 0:
+        pixels = np.asarray(image, dtype=np.float32)
+        noise_rng = np.random.default_rng(rng.randrange(2 ** 32))
+        pixels += noise_rng.normal(0, 60 * noise, pixels.shape)
+        speckle = noise_rng.random(pixels.shape) < 0.02 * noise
+        pixels[speckle] = 0
+        image = Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8))
+        image = image.filter(ImageFilter.GaussianBlur(1.5 * noise))
+        image = image.rotate(rng.uniform(-2, 2) * noise, fillcolor=255, resample=Image.BILINEAR)
+    return image
+
+
+def write_pdf(pdf_path, pages=20, noise=0.0, seed=0, rules_path=DEFAULT_RULES_PATH):
+    """
+    Writes a `pages`-page check PDF and '<pdf_path>.truth.json' with the
+    printed lines and expected fields of each page. Returns that list.
+    """
+    rng = random.Random(seed)
+    config = load_config(rules_path)
+    checks = [make_check(rng, config) for _ in range(pages)]
+    images = (render_check(check, noise, rng) for check in checks)
+    first = next(images)
+    first.save(pdf_path, "PDF", resolution=DPI, save_all=True, append_images=list(images))
+    with open(pdf_path + ".truth.json", 'w', encoding='utf-8') as f:
+        json.dump(checks, f, ensure_ascii=False, indent=1)
+    return checks
+
+
+def load_truth(pdf_path):
+    with open(pdf_path + ".truth.json", encoding='utf-8') as f:
+        return json.load(f)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Generate a synthetic check PDF with ground truth")
+    parser.add_argument("pdf_path")
+    parser.add_argument("--pages", type=int, default=20)
+    parser.add_argument("--noise", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    write_pdf(args.pdf_path, args.pages, args.noise, args.seed)
+    print(f"Wrote {args.pages} checks to {args.pdf_path}")
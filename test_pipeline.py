@@ -0,0 +1,210 @@
+"""
+Tests of the pure-Python parts of the pipeline: the Vision backend against
+fakevision.py, the rules engine against the original parser, and resuming
+batch jobs and CSV imports in the store. No OCR models or poppler needed.
+
+    python -m pytest -q
+"""
+import csv
+import io
+import random
+import re
+
+import numpy as np
+import pytest
+from PIL import Image
+
+import fakevision
+from checkrules import FIELDS
+from checkstore import CheckStore
+from parsepdf import parse_check_info
+from visionbackend import HttpVisionTransport, VisionBackend
+
+
+# --- Vision backend ---
+
+def _pixel_responder(content):
+    """Each test crop is filled with its index, so the text says which crop it was."""
+    return f"crop {Image.open(io.BytesIO(content)).getpixel((0, 0))}"
+
+
+def test_vision_imap_keeps_order_and_retries_quota_errors():
+    server = fakevision.serve(quota_every=3, responder=_pixel_responder)
+    backend = VisionBackend(HttpVisionTransport(server.endpoint), batch_size=3, max_in_flight=4, backoff=0.01)
+    try:
+        crops = [np.full((8, 8), i, dtype=np.uint8) for i in range(20)]
+        jobs = [(crops[start:start + 5], ["upper"] * 5) for start in range(0, len(crops), 5)]
+        texts = [tokens[0][1] for results in backend.imap(jobs) for tokens in results]
+    finally:
+        backend.shutdown()
+        server.shutdown()
+
+    assert texts == [f"crop {i}" for i in range(20)]
+    counters = backend.counters()
+    assert counters["retries"] > 0
+    assert counters["images"] == 20
+    assert counters["requests"] == server.requests_served
+
+
+# --- Rules engine ---
+
+def baseline_parse_check_info(page_text):
+    """parse_check_info() as it was before the rules engine (check_rules.json)."""
+    info = {
+        "bank_name": None,
+        "platite_racun_br": None,
+        "broj_tekuceg_racuna": None,
+        "serijski_broj": None
+    }
+    parts = page_text.split('#############')
+    upper_text = parts[0]
+    lower_text = parts[1] if len(parts) > 1 else ""
+
+    bank_pattern = re.compile(
+        r"(Erste Bank a\.d\. Novi Sad|BANKA POSTANSKA ŠTEDIONICA|otpbanka|UniCredit Bank |BANCA INTESA|NLB Komercijalna banka)",
+        re.IGNORECASE
+    )
+    match = bank_pattern.search(upper_text)
+    if match:
+        info["bank_name"] = match.group(1).strip()
+
+    platite_pattern = re.compile(r"(\d{3}-\d{5,}-\d{2})")
+    match = platite_pattern.search(upper_text)
+    if match:
+        info["platite_racun_br"] = match.group(1)
+
+    number_pattern = re.compile(r"(\b\d{3}\b|\b[\d-]{10,}\w?\b)")
+    numbers_found = number_pattern.findall(lower_text)
+
+    final_numbers = []
+    if len(numbers_found) == 3:
+        final_numbers = [numbers_found[0], numbers_found[1] + numbers_found[2]]
+    elif len(numbers_found) == 2:
+        final_numbers = numbers_found
+    elif len(numbers_found) == 1:
+        info["serijski_broj"] = numbers_found[0]
+
+    if len(final_numbers) == 2:
+        num1, num2 = final_numbers
+        if '-' in num1 or num1.startswith(('200', '340', '325', '170')):
+            info["broj_tekuceg_racuna"] = str(num1)
+            info["serijski_broj"] = str(num2)
+        else:
+            info["broj_tekuceg_racuna"] = str(num2)
+            info["serijski_broj"] = num1
+
+    return info
+
+
+BANKS = ["Erste Bank a.d. Novi Sad", "BANKA POSTANSKA ŠTEDIONICA", "otpbanka", "UniCredit Bank ",
+         "BANCA INTESA", "NLB Komercijalna banka"]
+WORDS = ["Filijala", "Beograd", "Platite", "sa", "računa", "br.", "Iznos", "Datum", "x", "-", "Unicredit"]
+
+
+def _random_number(rng):
+    digits = lambda n: "".join(rng.choice("0123456789") for _ in range(n))
+    form = rng.randrange(6)
+    if form == 0:
+        return digits(3)
+    if form == 1:
+        return f"{rng.choice(['200', '340', '325', '170', '160'])}-{digits(rng.randint(4, 13))}-{digits(2)}"
+    if form == 2:
+        return digits(rng.randint(8, 18))
+    if form == 3:
+        return digits(rng.randint(10, 15)) + rng.choice("ABx")
+    if form == 4:
+        return f"{digits(3)}-{digits(2)}"
+    return digits(rng.randint(1, 6))
+
+
+def _random_case(rng, text):
+    return "".join(char.upper() if rng.random() < 0.3 else char.lower() if rng.random() < 0.3 else char
+                   for char in text)
+
+
+def _random_page(rng):
+    upper = [rng.choice(WORDS) for _ in range(rng.randint(0, 5))]
+    if rng.random() < 0.7:
+        upper.insert(rng.randint(0, len(upper)), _random_case(rng, rng.choice(BANKS)))
+    upper += [_random_number(rng) for _ in range(rng.randint(0, 2))]
+    lower = [rng.choice(WORDS + [_random_number(rng)] * 4) for _ in range(rng.randint(0, 5))]
+    return rng.choice([" ", "\n"]).join(upper) + "\n#############\n" + "  ".join(lower)
+
+
+def test_rules_engine_matches_original_parser():
+    rng = random.Random(8)
+    for _ in range(5000):
+        page = _random_page(rng)
+        expected = baseline_parse_check_info(page)
+        parsed = parse_check_info(page)
+        # The rules engine returns the canonical bank name, the old parser the text as read
+        if expected["bank_name"] is not None:
+            expected["bank_name"] = expected["bank_name"].lower()
+        if parsed["bank_name"] is not None:
+            parsed["bank_name"] = parsed["bank_name"].lower()
+        assert {field: parsed[field] for field in FIELDS} == expected, page
+
+
+# --- Store: batch jobs and CSV import ---
+
+def _page(page_num, serial):
+    return {"pdf_name": "scan", "page_num": page_num, "serijski_broj": serial,
+            "broj_tekuceg_racuna": "340-0000012345678-12"}
+
+
+def test_job_resumes_after_last_committed_page(tmp_path):
+    db_path = str(tmp_path / "results.db")
+    store = CheckStore(db_path)
+    assert store.start_job("/in/scan.pdf", "100:1") == 1
+    store.add_page("/in/scan.pdf", _page(1, "0012345601"))
+    store.add_page("/in/scan.pdf", _page(2, "0012345602"))
+    store.close()  # crash after page 2
+
+    store = CheckStore(db_path)
+    assert store.start_job("/in/scan.pdf", "100:1") == 3
+    store.add_page("/in/scan.pdf", _page(3, "0012345603"))
+    store.finish_job("/in/scan.pdf")
+    assert store.start_job("/in/scan.pdf", "100:1") is None
+    assert [row["page_num"] for row in store.iter_rows()] == [1, 2, 3]
+    assert all(row["duplicate_of"] == "" for row in store.iter_rows())
+
+    # A changed file starts over and replaces its old rows
+    assert store.start_job("/in/scan.pdf", "100:2") == 1
+    assert store.count() == 0
+    store.close()
+
+
+def _write_csv(path, rows):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=["pdf_name", "page_num", "serijski_broj"])
+        writer.writeheader()
+        writer.writerows({"pdf_name": "old", "page_num": i + 1, "serijski_broj": str(i)} for i in range(rows))
+
+
+class _Interrupted(Exception):
+    pass
+
+
+def test_interrupted_csv_import_resumes(tmp_path):
+    csv_path = str(tmp_path / "results.csv")
+    db_path = str(tmp_path / "results.db")
+    _write_csv(csv_path, 25)
+
+    def stop_after_first_chunk(imported):
+        raise _Interrupted
+
+    store = CheckStore(db_path)
+    assert store.needs_import(csv_path)
+    with pytest.raises(_Interrupted):
+        store.import_csv(csv_path, chunk_size=10, on_rows=stop_after_first_chunk)
+    store.close()
+
+    store = CheckStore(db_path)
+    assert store.count() == 10
+    assert store.needs_import(csv_path)
+    with pytest.raises(RuntimeError):
+        store.export_csv(csv_path)
+    assert store.import_csv(csv_path, chunk_size=10) == 15
+    assert not store.needs_import(csv_path)
+    assert [row["page_num"] for row in store.iter_rows()] == list(range(1, 26))
+    store.close()
@@ -0,0 +1,203 @@
+import base64
+import io
+import json
+import random
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image
+
+from ocrbackend import OCRBackend
+
+
+# Google Vision accepts at most 16 images per images:annotate call
+MAX_IMAGES_PER_REQUEST = 16
+
+
+def encode_png(crop):
+    """PNG bytes of a numpy crop, encoded in memory."""
+    buffer = io.BytesIO()
+    Image.fromarray(crop).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+class QuotaError(Exception):
+    """The service asked us to slow down (quota exhausted / overloaded). Safe to retry."""
+
+
+class GoogleVisionTransport:
+    """Sends batches through the official client's batch_annotate_images()."""
+
+    def __init__(self, client=None):
+        from google.cloud import vision
+        from google.api_core import exceptions
+
+        self._vision = vision
+        self._retryable = (exceptions.ResourceExhausted, exceptions.TooManyRequests,
+                           exceptions.ServiceUnavailable)
+        self._client = client
+        self.version = getattr(vision, "__version__", "unknown")
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = self._vision.ImageAnnotatorClient()
+        return self._client
+
+    def annotate(self, contents):
+        vision = self._vision
+        feature = vision.Feature(type_=vision.Feature.Type.TEXT_DETECTION)
+        requests = [vision.AnnotateImageRequest(image=vision.Image(content=content), features=[feature])
+                    for content in contents]
+        try:
+            response = self.client.batch_annotate_images(requests=requests)
+        except self._retryable as e:
+            raise QuotaError(str(e)) from e
+        texts = []
+        for result in response.responses:
+            if result.error.code:
+                raise RuntimeError(f"Vision error: {result.error.message}")
+            texts.append(result.full_text_annotation.text)
+        return texts
+
+
+class HttpVisionTransport:
+    """
+    Talks to the Vision REST API (POST <endpoint>/v1/images:annotate) with
+    urllib. Pointed at fakevision.py it needs no network or credentials.
+    """
+
+    version = "v1"
+
+    def __init__(self, endpoint, api_key=None, timeout=60):
+        self.url = endpoint.rstrip("/") + "/v1/images:annotate"
+        if api_key:
+            self.url += f"?key={api_key}"
+        self.timeout = timeout
+
+    def annotate(self, contents):
+        body = json.dumps({"requests": [
+            {"image": {"content": base64.b64encode(content).decode("ascii")},
+             "features": [{"type": "TEXT_DETECTION"}]}
+            for content in contents
+        ]}).encode("utf-8")
+        request = urllib.request.Request(self.url, data=body, headers={"Content-Type": "application/json"})
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                payload = json.load(response)
+        except urllib.error.HTTPError as e:
+            if e.code in (429, 503):
+                raise QuotaError(f"HTTP {e.code}") from e
+            raise
+        texts = []
+        for result in payload.get("responses", []):
+            if "error" in result:
+                raise RuntimeError(f"Vision error: {result['error'].get('message')}")
+            texts.append(result.get("fullTextAnnotation", {}).get("text", ""))
+        return texts
+
+
+class VisionBackend(OCRBackend):
+    """
+    Concurrent Google Vision OCR.
+    Crops are sent in batches of up to `batch_size` images per request, with at
+    most `max_in_flight` requests running at once. Quota errors are retried
+    with exponential backoff and jitter. Results always come back in the order
+    the crops were given.
+    """
+
+    name = "google-vision"
+
+    def __init__(self, transport=None, batch_size=MAX_IMAGES_PER_REQUEST, max_in_flight=4,
+                 max_retries=5, backoff=1.0):
+        self.transport = transport or GoogleVisionTransport()
+        self.batch_size = max(1, min(batch_size, MAX_IMAGES_PER_REQUEST))
+        self.max_in_flight = max_in_flight
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.retries = 0
+        self.requests = 0
+        self.images = 0
+        self._counter_lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_in_flight)
+
+    @property
+    def version(self):
+        return self.transport.version
+
+    def settings_key(self):
+        return "TEXT_DETECTION"
+
+    def counters(self):
+        with self._counter_lock:
+            return {"requests": self.requests, "images": self.images, "retries": self.retries}
+
+    def _annotate_with_retry(self, contents):
+        for attempt in range(self.max_retries + 1):
+            with self._counter_lock:
+                self.requests += 1
+            try:
+                texts = self.transport.annotate(contents)
+            except QuotaError:
+                if attempt == self.max_retries:
+                    raise
+                with self._counter_lock:
+                    self.retries += 1
+                time.sleep(self.backoff * (2 ** attempt) * (0.5 + random.random()))
+                continue
+            with self._counter_lock:
+                self.images += len(contents)
+            return texts
+
+    def _read_batch(self, crops):
+        texts = self._annotate_with_retry([encode_png(crop) for crop in crops])
+        # Vision only gives us the crop's text, so each crop becomes a single token
+        return [[[None, text, None]] for text in texts]
+
+    def submit(self, crops):
+        """Starts OCR of a list of numpy crops; returns one future per request batch."""
+        return [self._executor.submit(self._read_batch, crops[start:start + self.batch_size])
+                for start in range(0, len(crops), self.batch_size)]
+
+    def readtext_many(self, crops, batch_size=None):
+        """OCR tokens ([bbox, text, confidence] lists) of each crop, in order."""
+        return [result for future in self.submit(crops) for result in future.result()]
+
+    def imap(self, jobs, batch_size=None):
+        """
+        Takes an iterable of (crops, region names) jobs and yields, per job and
+        in job order, the OCR tokens of each crop. Only a bounded number of
+        jobs is queued ahead, so the producer never runs far in front.
+        """
+        pending = deque()
+        for crops, _ in jobs:
+            pending.append(self.submit(crops))
+            if len(pending) >= self.max_in_flight:
+                yield [result for future in pending.popleft() for result in future.result()]
+        while pending:
+            yield [result for future in pending.popleft() for result in future.result()]
+
+    def shutdown(self):
+        self._executor.shutdown(cancel_futures=True)
+
+
+_backends = {}
+_backends_lock = threading.Lock()
+
+
+def get_backend(endpoint=None, batch_size=MAX_IMAGES_PER_REQUEST, max_in_flight=4):
+    """
+    Returns a shared VisionBackend. With `endpoint` it talks REST to that URL
+    (e.g. a fakevision server), otherwise it uses the official client.
+    """
+    key = (endpoint, batch_size, max_in_flight)
+    with _backends_lock:
+        backend = _backends.get(key)
+        if backend is None:
+            transport = HttpVisionTransport(endpoint) if endpoint else GoogleVisionTransport()
+            backend = _backends[key] = VisionBackend(transport, batch_size, max_in_flight)
+        return backend